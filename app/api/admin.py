@@ -206,14 +206,29 @@ def get_all_vehicles(
 
 @router.get("/repair-orders", response_model=AdminRepairOrdersResponse)
 def get_all_repair_orders(
+    after_id: int = Query(
+        0, ge=0, description="Return orders with order_id greater than this (keyset cursor)"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Maximum orders to return"),
+    sort_by: Optional[str] = Query(
+        None, description="Sort by this repair_order column and page with offset instead of after_id"),
+    descending: bool = Query(True, description="Sort direction when sort_by is given"),
+    offset: int = Query(0, ge=0, description="Rows to skip when sort_by is given"),
     current_user: User = Depends(get_current_user),
     repair_order_service: RepairOrderService = Depends(
         get_repair_order_service)
 ):
     """
-    Get all repair orders in the system.
+    Get all repair orders in the system, optionally one keyset page at a time.
+    With `sort_by`, returns one page sorted by that column instead (offset/limit).
     Restricted to admin users only.
     Args:
+        after_id (int): Keyset cursor, the last order_id of the previous page.
+        limit (Optional[int]): Page size; all orders are returned when omitted
+            (50 when sort_by is given).
+        sort_by (Optional[str]): repair_order column to sort by, e.g. order_time.
+        descending (bool): Sort direction for sort_by.
+        offset (int): Rows to skip for sort_by pages.
         current_user (User): The currently authenticated user.
         repair_order_service (RepairOrderService): Service for repair order operations.
     Returns:
@@ -226,8 +241,16 @@ def get_all_repair_orders(
             message="Unauthorized: Only admin users can access this endpoint"
         )
 
-    # Fetch all repair orders
-    repair_orders = repair_order_service.get_all_repair_orders()
+    # Fetch all repair orders (or one sorted page, sliced on the server)
+    if sort_by is not None:
+        try:
+            repair_orders = repair_order_service.get_repair_orders_page(
+                offset=offset, limit=limit or 50, sort_col=sort_by, descending=descending)
+        except ValueError as e:
+            return AdminRepairOrdersResponse(status="failure", message=str(e))
+    else:
+        repair_orders = repair_order_service.get_all_repair_orders(
+            after_id=after_id, limit=limit)
     if not repair_orders:
         return AdminRepairOrdersResponse(
             status="failure",
@@ -298,7 +321,8 @@ def get_vehicle_type_statistics(
 
     try:
         # Fetch all repair orders
-        repair_orders = repair_order_service.get_all_repair_orders()
+        repair_orders = repair_order_service.get_all_repair_orders(
+            fields=["order_id", "request_id", "vehicle_id"])
         if not repair_orders:
             return {
                 "status": "success_no_data",
@@ -313,14 +337,18 @@ def get_vehicle_type_statistics(
         stats_by_type: Dict[str, Dict[str, Any]] = {}
         total_repairs = len(repair_orders)
 
+        # Vehicle types for every vehicle in one query, instead of one lookup per order
+        vehicle_columns = vehicle_service.get_all_vehicles_columnar()
+        type_by_vehicle = dict(zip(vehicle_columns["vehicle_id"], vehicle_columns["type"]))
+
         # Process each repair order to aggregate statistics
         for order in repair_orders:
-            # Fetch the vehicle associated with the repair order
-            vehicle = vehicle_service.get_vehicle_by_id(order.vehicle_id)
-            if not vehicle or not vehicle.type:
+            # Look up the type of the vehicle associated with the repair order
+            order_vehicle_type = type_by_vehicle.get(order.vehicle_id)
+            if not order_vehicle_type:
                 continue  # Skip if vehicle not found or type not specified
 
-            vehicle_type_str = vehicle.type.value if vehicle.type else "Unknown"
+            vehicle_type_str = order_vehicle_type.value
 
             # Initialize stats for this vehicle type if not already present
             if vehicle_type_str not in stats_by_type:
@@ -383,20 +411,23 @@ def get_vehicle_type_statistics(
                 fault_counts: Dict[str, int] = {}
                 total_repairs_for_type = 0
 
-                for order in repair_orders:
-                    vehicle = vehicle_service.get_vehicle_by_id(
-                        order.vehicle_id)
-                    if vehicle and vehicle.type and vehicle.type.value == target_vehicle_type.value:
-                        total_repairs_for_type += 1
-                        # Fetch the associated repair request to get the description (assumed to contain fault type)
-                        repair_request = repair_request_service.get_repair_request_by_id(
-                            order.request_id)
-                        if repair_request and repair_request.description:
-                            # Extract a simple fault type (for demonstration, assume description is fault type)
-                            fault_type = repair_request.description.split(
-                            )[0] if repair_request.description else "Unknown Fault"
-                            fault_counts[fault_type] = fault_counts.get(
-                                fault_type, 0) + 1
+                orders_for_type = [
+                    order for order in repair_orders
+                    if type_by_vehicle.get(order.vehicle_id) == target_vehicle_type]
+                # Fetch the associated repair requests in one batch to get the descriptions
+                requests_by_id = repair_request_service.get_repair_requests_by_ids(
+                    [order.request_id for order in orders_for_type])
+
+                for order in orders_for_type:
+                    total_repairs_for_type += 1
+                    # The description is assumed to contain the fault type
+                    repair_request = requests_by_id.get(order.request_id)
+                    if repair_request and repair_request.description:
+                        # Extract a simple fault type (for demonstration, assume description is fault type)
+                        fault_type = repair_request.description.split(
+                        )[0] if repair_request.description else "Unknown Fault"
+                        fault_counts[fault_type] = fault_counts.get(
+                            fault_type, 0) + 1
 
                 if total_repairs_for_type > 0:
                     fault_statistics = [
@@ -497,7 +528,8 @@ def get_cost_analysis(
             )
 
         # Fetch all repair orders within the date range
-        repair_orders = repair_order_service.get_all_repair_orders()
+        repair_orders = repair_order_service.get_all_repair_orders(
+            fields=["order_id", "order_time"])
         # Filter orders by date range (assuming order_time is a datetime string or object)
         filtered_orders = [
             order for order in repair_orders
@@ -756,7 +788,8 @@ def get_job_type_statistics(
             )
 
         # Fetch all repair orders within the date range
-        repair_orders = repair_order_service.get_all_repair_orders()
+        repair_orders = repair_order_service.get_all_repair_orders(
+            fields=["order_id", "order_time", "status"])
         # Filter orders by date range (assuming order_time is a datetime string or object)
         filtered_orders = [
             order for order in repair_orders
@@ -869,7 +902,8 @@ def get_uncompleted_tasks_statistics(
 
     try:
         # Fetch all repair orders
-        repair_orders = repair_order_service.get_all_repair_orders()
+        repair_orders = repair_order_service.get_all_repair_orders(
+            fields=["order_id", "status", "vehicle_id"])
         # Filter for uncompleted orders (status != COMPLETED)
         uncompleted_orders = [
             order for order in repair_orders
@@ -1065,6 +1099,66 @@ def admin_create_user(
             status_code=400, detail="discriminator must be one of: customer, staff, admin")
 
 
+@router.post("/create-users", response_model=Dict)
+def admin_create_users_bulk(
+    user_data: dict,
+    current_user: User = Depends(get_current_user),
+    user_service: UserService = Depends(get_user_service)
+):
+    """
+    Admin creates many customers or staff members at once (imports, backfills).
+    Body: {"discriminator": "customer" | "staff", "users": [<same fields as /create-user>, ...]}.
+    All users are created in one transaction; passwords are hashed in parallel.
+    """
+    if current_user.discriminator != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can create users"
+        )
+
+    discriminator = user_data.get("discriminator")
+    users = user_data.get("users")
+    if not isinstance(users, list) or not users:
+        raise HTTPException(
+            status_code=400, detail="users must be a non-empty list")
+    if discriminator not in ("customer", "staff"):
+        raise HTTPException(
+            status_code=400, detail="discriminator must be one of: customer, staff")
+
+    try:
+        if discriminator == "customer":
+            reqs = [CustomerCreate(**u) for u in users]
+            created = user_service.create_customers([UserCreate(
+                name=req.name,
+                username=req.username,
+                password=req.password,
+                phone=req.phone,
+                email=req.email,
+                address=req.address
+            ) for req in reqs])
+        else:
+            reqs = [StaffCreateRequest(**u) for u in users]
+            created = user_service.create_staff_bulk([StaffCreate(
+                name=req.name,
+                username=req.username,
+                password=req.password,
+                phone=req.phone,
+                email=req.email,
+                address=req.address,
+                jobtype=req.jobtype,
+                hourly_rate=req.hourly_rate
+            ) for req in reqs])
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Failed to create {discriminator} users: {e}")
+    return {
+        "status": "success",
+        "message": f"{len(created)} {discriminator} users created successfully",
+        "discriminator": discriminator,
+        "users": [{"user_id": u.user_id, "username": u.username} for u in created]
+    }
+
+
 @router.post("/update-user-profile/{user_id}", response_model=Dict)
 def admin_update_user_profile(
     user_id: int,
@@ -1110,7 +1204,7 @@ def admin_update_user_profile(
             user_service.db.update_data(
                 table_name="staff",
                 data=staff_data,
-                where=f"staff_id = {user.user_id}"
+                where="staff_id = ?", where_params=(user.user_id,)
             )
             # for audit
             staff_fields_updated = True
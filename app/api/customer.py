@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from ..crud.user import UserService
 from ..crud.vehicle import VehicleService
 from ..crud.repair_request import RepairRequestService
@@ -252,6 +253,10 @@ def get_customer_vehicles(
 @router.get("/{customer_id}/repair-requests", response_model=CustomerRepairRequestsResponse)
 def get_customer_repair_requests(
     customer_id: int,
+    after_id: int = Query(
+        0, ge=0, description="Return requests with request_id greater than this (keyset cursor)"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Maximum requests to return; all when omitted"),
     current_user: User = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
     repair_request_service: RepairRequestService = Depends(
@@ -262,6 +267,8 @@ def get_customer_repair_requests(
     Customers can only access their own repair requests, while admins can access any customer's repair requests.
     Args:
         customer_id (int): ID of the customer whose repair requests are to be retrieved.
+        after_id (int): Keyset cursor, the last request_id of the previous page.
+        limit (Optional[int]): Page size; every request is returned when omitted.
         current_user (User): The currently authenticated user.
         user_service (UserService): Service for user-related operations.
         repair_request_service (RepairRequestService): Service for repair request operations.
@@ -286,7 +293,7 @@ def get_customer_repair_requests(
 
     # Fetch repair requests for the customer
     repair_requests = repair_request_service.get_repair_requests_by_customer_id(
-        customer_id)
+        customer_id, after_id, limit)
     if not repair_requests:
         return CustomerRepairRequestsResponse(
             status="failure",
@@ -300,6 +307,9 @@ def get_customer_repair_requests(
         message="Repair requests retrieved successfully",
         customer_id=customer_id,
         customer_name=customer.name,
+        # 本页已满时返回下一页的游标，客户端据此判断是否还有更多数据
+        next_after_id=repair_requests[-1].request_id
+        if limit is not None and len(repair_requests) == limit else None,
         repair_requests=[{
             "request_id": request.request_id,
             "vehicle_id": request.vehicle_id,
@@ -471,8 +481,7 @@ def create_repair_request(
         )
 
     # Validate vehicle exists and belongs to the customer
-    vehicle = vehicle_service.get_vehicle_by_id(request_data.vehicle_id)
-    if not vehicle or vehicle.customer_id != customer_id:
+    if not vehicle_service.vehicle_exists(request_data.vehicle_id, customer_id):
         return CustomerRepairRequestCreateResponse(
             status="failure",
             message="Vehicle not found or not associated with this customer"
@@ -148,8 +148,9 @@ def get_staff_repair_orders(
             message="User is not a staff member"
         )
 
-    # Fetch repair orders for the staff member, including working hours
-    repair_order_data = repair_order_service.get_repair_orders_by_staff_id(
+    # Fetch repair orders for the staff member, including working hours,
+    # request and vehicle details in a single query
+    repair_order_data = repair_order_service.get_full_repair_orders_by_staff_id(
         staff_id)
 
     # Return structured response
@@ -940,7 +941,7 @@ def get_staff_salary_by_month(
 
     order_ids = {a.order_id for a in assignments}
     # 查所有相关repair_order
-    orders = {o.order_id: o for o in repair_order_service.get_all_repair_orders(
+    orders = {o.order_id: o for o in repair_order_service.get_all_repair_orders_iter(
     ) if o.order_id in order_ids}
     # 按月聚合
     monthly = DefaultDict(
@@ -37,8 +37,9 @@ def get_user_service(db: Database = Depends(get_db)):
         db (Database): Database instance.
     Returns:
         UserService: Instance of UserService for user-related operations.
+            FastAPI caches dependencies per request, so the lookup cache is request-scoped.
     """
-    return UserService(db)
+    return UserService(db).with_request_cache()
 
 
 def get_vehicle_service(db: Database = Depends(get_db)):
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any, Union
+from typing import Optional, Any, Union, Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
@@ -18,12 +20,38 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound and releases the GIL; one shared pool sized to the cores
+# keeps parallel hashing from oversubscribing the CPU
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="password-hash")
+
+# Seeding / load-test mode: equal passwords share one hash instead of being
+# re-hashed. Never enable in production, equal hashes reveal equal passwords.
+BULK_SEEDING = os.getenv("BULK_SEEDING", "0") == "1"
+
+
+@lru_cache(maxsize=1024)
+def _seeding_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
 
 def get_password_hash(password: str) -> str:
     '''Hashes a password using bcrypt'''
+    if BULK_SEEDING:
+        return _seeding_hash(password)
     return pwd_context.hash(password)
 
 
+def hash_passwords(passwords: Iterable[str]) -> List[str]:
+    '''Hashes many passwords in parallel on the hashing pool, preserving order'''
+    if BULK_SEEDING:
+        # hash each distinct password once, then fan the results back out
+        passwords = list(passwords)
+        unique = list(dict.fromkeys(passwords))
+        hashed = dict(zip(unique, _HASH_POOL.map(get_password_hash, unique)))
+        return [hashed[p] for p in passwords]
+    return list(_HASH_POOL.map(get_password_hash, passwords))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     '''Verifies a password against a hash'''
     return pwd_context.verify(plain_password, hashed_password)
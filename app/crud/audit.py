@@ -1,18 +1,114 @@
 import json
+import logging
+import queue
+import threading
 from ..db.connection import Database
 from ..models.audit import AuditLog
 from ..models.enums import OperationType
 
-from typing import Optional, List
+from typing import Optional, List, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# audit_log columns written by AuditLogWriter (log_id is generated by the database)
+_AUDIT_COLUMNS = ("table_name", "record_id", "operation", "old_data", "new_data", "operated_at")
+
+
+class AuditLogWriter:
+    """
+    Background writer for audit events: events are queued by the request thread
+    and inserted by a daemon thread in batches of up to `batch_size` rows,
+    or whatever has arrived within `flush_interval` seconds.
+    """
+
+    def __init__(self, db: Database, maxsize: int = 10000, batch_size: int = 128, flush_interval: float = 0.02, put_timeout: float = 1.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._q = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._flusher, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row: dict) -> bool:
+        """
+        Queue an audit_log row. When the queue is full the producer is blocked
+        for up to `put_timeout` seconds (backpressure); returns False if it is
+        still full after that.
+        """
+        try:
+            self._q.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self) -> None:
+        """
+        Block until every queued event has been written.
+        """
+        self._q.join()
+
+    def _flusher(self) -> None:
+        while True:
+            batch = [self._q.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._q.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            # 按固定列取值，缺失的键写 NULL，不依赖首个事件的键顺序
+            rows = [tuple(e.get(c) for c in _AUDIT_COLUMNS) for e in batch]
+            try:
+                self.db.insert_many("audit_log", _AUDIT_COLUMNS, rows)
+            except Exception as e:
+                logger.warning("Failed to write %d audit events as a batch, retrying one by one: %s", len(rows), e)
+                self._write_one_by_one(rows)
+            finally:
+                for _ in batch:
+                    self._q.task_done()
+
+    def _write_one_by_one(self, rows: List[tuple]) -> None:
+        # 一行出错只丢这一行，其余照常写入
+        for row in rows:
+            try:
+                self.db.insert_many("audit_log", _AUDIT_COLUMNS, [row])
+            except Exception as e:
+                logger.error("Failed to write audit event %s: %s", row[:3], e)
+
+
+# 每个 Database 共享一个后台写入器（服务对象按请求创建，不能各自起线程）
+_writers: dict = {}
+_writers_lock = threading.Lock()
+
+
+def _get_writer(db: Database) -> AuditLogWriter:
+    with _writers_lock:
+        writer = _writers.get(db)
+        if writer is None:
+            writer = _writers[db] = AuditLogWriter(db)
+        return writer
 
 
 class AuditLogService:
+    # Process-wide switches, set once at startup (see main.py)
+    enabled: bool = True
+    disabled_tables: frozenset = frozenset()
+
     def __init__(self, db: Database):
         self.db = db
 
-    def log_audit_event(self, table_name: str, record_id: int, operation: OperationType, old_data: dict = None, new_data: dict = None):
+    def is_enabled(self, table_name: str) -> bool:
+        """
+        Whether events for `table_name` are recorded. Callers check this before
+        building audit images, so nothing is serialized when auditing is off.
+        """
+        return self.enabled and table_name not in self.disabled_tables
+
+    def enqueue(self, table_name: str, record_id: int, operation: OperationType, old_data: dict = None, new_data: dict = None):
         """
         Log an audit event for a database operation.
+        The event is queued and written in the background; if the queue stays full
+        it is written synchronously instead of being dropped.
         Args:
             table_name (str): Name of the table affected.
             record_id (int): ID of the record affected.
@@ -20,6 +116,111 @@ class AuditLogService:
             old_data (dict, optional): Data before the operation.
             new_data (dict, optional): Data after the operation.
         """
+        if not self.is_enabled(table_name):
+            return
+        audit_log_dict = self._build_audit_row(
+            table_name, record_id, operation, old_data, new_data)
+        # log_id is generated by the database
+        audit_log_dict.pop("log_id", None)
+
+        if not _get_writer(self.db).put(audit_log_dict):
+            self.db.execute_batch([self.db.build_insert("audit_log", audit_log_dict)])
+
+    # 兼容旧的调用名
+    log_audit_event = enqueue
+
+    def flush(self) -> None:
+        """
+        Wait until all queued audit events for this database have been written.
+        """
+        _get_writer(self.db).flush()
+
+    def build_audit_sql(self, table_name: str, record_id: int, operation: OperationType, old_data: dict = None, new_data: dict = None) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build the audit_log INSERT for an event without executing it, so callers can
+        send it in the same Database.execute_batch as the mutation it describes.
+        Returns:
+            (query, params) pair.
+        """
+        return self.db.build_insert(
+            "audit_log", self._build_audit_row(table_name, record_id, operation, old_data, new_data))
+
+    def build_snapshot_sql(self, variable: str, table_name: str, columns: Tuple[str, ...], pk_field: str, record_id: int) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build a statement that stores a JSON snapshot of one row in the session
+        variable @<variable> (NULL if the row does not exist), locking the row.
+        """
+        json_object = "JSON_OBJECT(" + ", ".join(f"'{col}', {col}" for col in columns) + ")"
+        return (f"SET @{variable} = (SELECT {json_object} FROM {table_name} WHERE {pk_field} = ? FOR UPDATE)",
+                (record_id,))
+
+    def build_snapshot_audit_sql(self, table_name: str, record_id: int, operation: OperationType, old_data: bool = False, new_data: bool = False) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build an audit_log INSERT that reads old/new data from the @audit_old_data /
+        @audit_new_data snapshots taken earlier in the same batch (see build_snapshot_sql).
+        Nothing is inserted when the snapshots are NULL, i.e. the record did not exist.
+        """
+        from datetime import datetime
+
+        old_sql = "@audit_old_data" if old_data else "NULL"
+        new_sql = "@audit_new_data" if new_data else "NULL"
+        return ("INSERT INTO audit_log (table_name, record_id, operation, old_data, new_data, operated_at) "
+                f"SELECT ?, ?, ?, {old_sql}, {new_sql}, ? FROM DUAL WHERE COALESCE({old_sql}, {new_sql}) IS NOT NULL",
+                (table_name, record_id, operation.value, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+    def insert_with_audit(self, table_name: str, data: dict, pk_field: str, new_data: dict = None) -> Optional[int]:
+        """
+        Insert a row together with its INSERT audit event in one round-trip.
+        The generated primary key is written into the audited new_data on the server side.
+        LAST_INSERT_ID() is per connection and unaffected by triggers, and it is captured
+        right after the INSERT, before the audit INSERT would overwrite it.
+        Args:
+            table_name (str): Name of the table to insert into.
+            data (dict): Column values of the new row.
+            pk_field (str): Name of the auto-increment primary key column.
+            new_data (dict, optional): Data to audit, defaults to `data`;
+                pass None when is_enabled(table_name) is False.
+        Returns:
+            Optional[int]: The generated primary key.
+        """
+        statements = [
+            self.db.build_insert(table_name, data),
+            ("SET @last_insert_id = LAST_INSERT_ID()", ()),
+            ("SELECT @last_insert_id", ()),
+        ]
+        if self.is_enabled(table_name):
+            statements.insert(2, self.build_insert_audit_sql(table_name, new_data or data, (pk_field,)))
+        rows = self.db.execute_batch(statements)
+        return int(rows[0][0]) if rows and rows[0][0] is not None else None
+
+    def build_insert_audit_image(self, table_name: str, new_data: dict) -> Tuple[str, str]:
+        """
+        Serialize an INSERT event for a stored procedure that writes the audit row
+        itself, so the image matches the rows written by build_insert_audit_sql.
+        Returns:
+            (new_data JSON, operated_at) pair.
+        """
+        audit = self._build_audit_row(table_name, None, OperationType.INSERT, new_data=new_data)
+        return audit["new_data"], audit["operated_at"]
+
+    def build_insert_audit_sql(self, table_name: str, new_data: dict, id_fields: Tuple[str, ...]) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build the INSERT audit event for a row whose generated id is held in
+        @last_insert_id earlier in the same batch; the id is used as record_id
+        and written into each of `id_fields` of the audited new_data.
+        """
+        audit = self._build_audit_row(
+            table_name, None, OperationType.INSERT, new_data=new_data)
+        paths = ", ".join("?, @last_insert_id" for _ in id_fields)
+        return ("INSERT INTO audit_log (table_name, record_id, operation, new_data, operated_at) "
+                f"VALUES (?, @last_insert_id, ?, JSON_SET(?, {paths}), ?)",
+                (table_name, audit["operation"], audit["new_data"],
+                 *(f"$.{field}" for field in id_fields), audit["operated_at"]))
+
+    def _build_audit_row(self, table_name: str, record_id: Optional[int], operation: OperationType, old_data: dict = None, new_data: dict = None) -> dict:
+        """
+        Build the audit_log row (JSON-encoded data, formatted timestamp) for an event.
+        """
         from datetime import datetime
 
         def serialize_datetimes(obj):
@@ -58,17 +259,17 @@ class AuditLogService:
 
         # Make sure 'operated_at' is set correctly
         audit_log_dict["operated_at"] = formatted_datetime
-        print(audit_log_dict)
-
-        # Insert the audit log into the database
-        self.db.insert_data(table_name="audit_log", data=audit_log_dict)
+        return audit_log_dict
 
     def get_audit_logs(self, table_name: Optional[str] = None, operation: Optional[str] = None, limit: int = 100) -> List[AuditLog]:
         where_clauses = []
+        where_params = []
         if table_name:
-            where_clauses.append(f"table_name = '{table_name}'")
+            where_clauses.append("table_name = ?")
+            where_params.append(table_name)
         if operation:
-            where_clauses.append(f"operation = '{operation}'")
+            where_clauses.append("operation = ?")
+            where_params.append(operation)
         where_stmt = " AND ".join(where_clauses) if where_clauses else None
         logs = self.db.select_data(
             table_name="audit_log",
@@ -77,6 +278,7 @@ class AuditLogService:
                 "old_data", "new_data", "operated_at"
             ],
             where=where_stmt,
+            where_params=tuple(where_params),
             order_by="operated_at DESC",
             limit=limit
         )
@@ -121,7 +323,7 @@ class AuditLogService:
             if not old_data:
                 raise Exception("No old_data for rollback (update case).")
             db.update_data(table_name=table_name, data=old_data,
-                           where=f"{pk_field} = {record_id}")
+                           where=f"{pk_field} = ?", where_params=(record_id,))
             return f"Rolled back last UPDATE for {table_name}({record_id})."
         elif op == "DELETE" or (hasattr(op, "value") and op.value == "DELETE"):
             if not old_data:
@@ -130,7 +332,7 @@ class AuditLogService:
             return f"Rolled back last DELETE: reinserted {table_name}({record_id})."
         elif op == "INSERT" or (hasattr(op, "value") and op.value == "INSERT"):
             db.delete_data(table_name=table_name,
-                           where=f"{pk_field} = {record_id}")
+                           where=f"{pk_field} = ?", where_params=(record_id,))
             return f"Rolled back last INSERT: deleted {table_name}({record_id})."
         else:
             raise Exception(f"Unknown operation type: {op}")
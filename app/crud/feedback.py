@@ -31,20 +31,11 @@ class FeedbackService:
             comments=comments,
             feedback_time=str(datetime.now())
         )
-        # Insert data into 'feedback' table
-        self.db.insert_data(
+        # Insert into 'feedback' and log the audit event in one round-trip
+        feedback.feedback_id = self.audit_log_service.insert_with_audit(
             table_name="feedback",
-            data=feedback.asdict()
-        )
-        # Retrieve last inserted ID (MySQL)
-        last_id_row = self.db.execute_query("SELECT LAST_INSERT_ID();")
-        feedback_id = int(last_id_row[0][0]) if last_id_row else None
-        feedback.feedback_id = feedback_id
-        # Log audit event
-        self.audit_log_service.log_audit_event(
-            table_name="feedback",
-            record_id=feedback.feedback_id,
-            operation=OperationType.INSERT,
+            data=feedback.asdict(),
+            pk_field="feedback_id",
             new_data=self._object_to_dict(feedback)
         )
         return feedback
@@ -60,7 +51,7 @@ class FeedbackService:
             table_name="feedback",
             columns=["feedback_id", "customer_id", "order_id",
                      "log_id", "rating", "comments", "feedback_time"],
-            where=f"feedback_id = {feedback_id}",
+            where="feedback_id = ?", where_params=(feedback_id,),
             limit=1
         )
         if not rows:
@@ -90,7 +81,7 @@ class FeedbackService:
             table_name="feedback",
             columns=["feedback_id", "customer_id", "order_id",
                      "log_id", "rating", "comments", "feedback_time"],
-            where=f"order_id = {order_id}"
+            where="order_id = ?", where_params=(order_id,)
         )
         if not rows:
             return []
@@ -121,7 +112,7 @@ class FeedbackService:
             table_name="feedback",
             columns=["feedback_id", "customer_id", "order_id",
                      "log_id", "rating", "comments", "feedback_time"],
-            where=f"rating <= {max_rating}",
+            where="rating <= ?", where_params=(max_rating,),
             order_by="feedback_time DESC"
         )
         if not rows:
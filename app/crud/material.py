@@ -31,8 +31,8 @@ class MaterialService:
             remarks=remarks
         )
 
-        # 插入
-        self.db.insert_data(
+        # 插入 + 审计，一次往返
+        material.material_id = self.audit_log_service.insert_with_audit(
             table_name="material",
             data={
                 "log_id":      material.log_id,
@@ -40,18 +40,8 @@ class MaterialService:
                 "quantity":    material.quantity,
                 "unit_price":  material.unit_price,
                 "remarks":     material.remarks
-            }
-        )
-
-        # 获取自增主键
-        row = self.db.execute_query("SELECT LAST_INSERT_ID()")
-        material.material_id = int(row[0][0]) if row else None
-
-        # 审计
-        self.audit_log_service.log_audit_event(
-            table_name="material",
-            record_id=material.material_id,
-            operation=OperationType.INSERT,
+            },
+            pk_field="material_id",
             new_data=self._object_to_dict(material)
         )
         return material
@@ -66,7 +56,7 @@ class MaterialService:
                 "material_id", "log_id", "name",
                 "quantity", "unit_price", "remarks"
             ],
-            where=f"material_id = {material_id}",
+            where="material_id = ?", where_params=(material_id,),
         )
         if not rows:
             return None
@@ -91,7 +81,7 @@ class MaterialService:
                 "material_id", "log_id", "name",
                 "quantity", "unit_price", "remarks"
             ],
-            where=f"log_id = {log_id}",
+            where="log_id = ?", where_params=(log_id,),
             order_by="material_id ASC"
         )
         return [
@@ -143,7 +133,7 @@ class MaterialService:
             self.db.update_data(
                 table_name="material",
                 data=data,
-                where=f"material_id = {material_id}",
+                where="material_id = ?", where_params=(material_id,),
             )
             # 审计
             self.audit_log_service.log_audit_event(
@@ -169,7 +159,7 @@ class MaterialService:
         # 调用通用删除
         deleted = self.db.delete_data(
             table_name="material",
-            where=f"material_id = {material_id}",
+            where="material_id = ?", where_params=(material_id,),
         )
         if deleted:
             self.audit_log_service.log_audit_event(
@@ -28,26 +28,16 @@ class RepairAssignmentService:
             time_worked=time_worked
         )
 
-        # 使用 insert_data 统一插入
-        self.db.insert_data(
+        # 插入 + 审计日志，一次往返
+        assignment.assignment_id = self.audit_log_service.insert_with_audit(
             table_name="repair_assignment",
             data={
                 "order_id":    assignment.order_id,
                 "staff_id":    assignment.staff_id,
                 "status":      assignment.status,
                 "time_worked": assignment.time_worked
-            }
-        )
-
-        # 获取自增主键
-        row = self.db.execute_query("SELECT LAST_INSERT_ID()")
-        assignment.assignment_id = int(row[0][0]) if row else None
-
-        # 审计日志
-        self.audit_log_service.log_audit_event(
-            table_name="repair_assignment",
-            record_id=assignment.assignment_id,
-            operation=OperationType.INSERT,
+            },
+            pk_field="assignment_id",
             new_data=self._object_to_dict(assignment)
         )
         return assignment
@@ -78,7 +68,7 @@ class RepairAssignmentService:
         self.db.update_data(
             table_name="repair_assignment",
             data={"status": new_status},
-            where=f"assignment_id = {assignment_id}"
+            where="assignment_id = ?", where_params=(assignment_id,)
         )
 
         assignment.status = new_status
@@ -122,16 +112,19 @@ class RepairAssignmentService:
         """
         try:
             # Build the WHERE clause for the database query
-            where_clause = f"jobtype = '{required_staff_type}'"
+            where_clause = "jobtype = ?"
+            where_params = (required_staff_type,)
             if exclude_staff_id is not None:
-                where_clause += f" AND staff_id != {exclude_staff_id}"
+                where_clause += " AND staff_id != ?"
+                where_params += (exclude_staff_id,)
 
             # Query the database for eligible staff
             # Adjust column names and table name based on your schema
             staff_rows = self.db.select_data(
                 table_name="staff",
                 columns=["staff_id", "jobtype", "hourly_rate"],
-                where=where_clause
+                where=where_clause,
+                where_params=where_params
             )
 
             if not staff_rows:
@@ -164,7 +157,7 @@ class RepairAssignmentService:
             table_name="repair_assignment",
             columns=["assignment_id", "order_id",
                      "staff_id", "status", "time_worked"],
-            where=f"assignment_id = {assignment_id}",
+            where="assignment_id = ?", where_params=(assignment_id,),
         )
         if not rows:
             return None
@@ -192,7 +185,7 @@ class RepairAssignmentService:
             table_name="repair_assignment",
             columns=["assignment_id", "order_id",
                      "staff_id", "status", "time_worked"],
-            where=f"staff_id = {staff_id}"
+            where="staff_id = ?", where_params=(staff_id,)
         )
         return [
             RepairAssignment(
@@ -219,7 +212,7 @@ class RepairAssignmentService:
             table_name="repair_assignment",
             columns=["assignment_id", "order_id",
                      "staff_id", "status", "time_worked"],
-            where=f"order_id = {order_id}"
+            where="order_id = ?", where_params=(order_id,)
         )
         return [
             RepairAssignment(
@@ -245,7 +238,7 @@ class RepairAssignmentService:
             table_name="repair_assignment",
             columns=["assignment_id", "order_id",
                      "staff_id", "status", "time_worked"],
-            where=f"assignment_id = {assignment_id}",
+            where="assignment_id = ?", where_params=(assignment_id,),
         )
         if not rows:
             return None
@@ -262,7 +255,7 @@ class RepairAssignmentService:
         self.db.update_data(
             table_name="repair_assignment",
             data={"time_worked": time_worked},
-            where=f"assignment_id = {assignment_id}",
+            where="assignment_id = ?", where_params=(assignment_id,),
         )
 
         # 构造新的对象
@@ -293,7 +286,7 @@ class RepairAssignmentService:
             table_name="repair_assignment",
             columns=["assignment_id", "order_id",
                      "staff_id", "status", "time_worked"],
-            where=f"assignment_id = {assignment_id}",
+            where="assignment_id = ?", where_params=(assignment_id,),
         )
         if not rows:
             return False
@@ -309,7 +302,7 @@ class RepairAssignmentService:
         # 删除
         deleted = self.db.delete_data(
             table_name="repair_assignment",
-            where=f"assignment_id = {assignment_id}",
+            where="assignment_id = ?", where_params=(assignment_id,),
         )
         if deleted:
             self.audit_log_service.log_audit_event(
@@ -23,26 +23,16 @@ class RepairLogService:
             log_message=log_message
         )
 
-        # 使用 insert_data 统一插入
-        self.db.insert_data(
+        # 插入 + 审计日志，一次往返
+        repair_log.log_id = self.audit_log_service.insert_with_audit(
             table_name="repair_log",
             data={
                 "order_id": repair_log.order_id,
                 "staff_id": repair_log.staff_id,
                 "log_time":   repair_log.log_time,
                 "log_message": repair_log.log_message,
-            }
-        )
-
-        # 获取自增主键
-        row = self.db.execute_query("SELECT LAST_INSERT_ID()")
-        repair_log.log_id = int(row[0][0]) if row else None
-
-        # 审计日志
-        self.audit_log_service.log_audit_event(
-            table_name="repair_log",
-            record_id=repair_log.log_id,
-            operation=OperationType.INSERT,
+            },
+            pk_field="log_id",
             new_data=self._object_to_dict(repair_log)
         )
         return repair_log
@@ -54,7 +44,7 @@ class RepairLogService:
         rows = self.db.select_data(
             table_name="repair_log",
             columns=["log_id", "order_id", "staff_id", "log_time", "log_message"],
-            where=f"log_id = {log_id}",
+            where="log_id = ?", where_params=(log_id,),
         )
         if not rows:
             return None
@@ -75,7 +65,7 @@ class RepairLogService:
         rows = self.db.select_data(
             table_name="repair_log",
             columns=["log_id", "order_id", "staff_id", "log_time", "log_message"],
-            where=f"order_id = {order_id}",
+            where="order_id = ?", where_params=(order_id,),
             order_by="log_time ASC"
         )
         return [
@@ -2,14 +2,109 @@ from ..db.connection import Database
 from ..models.repair import RepairOrder
 from ..models.enums import RepairStatus, StaffJobType, OperationType
 from .audit import AuditLogService
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 from datetime import datetime
+from operator import attrgetter
+import copy
+import time
+
+
+_ORDER_COLUMNS = (
+    "order_id", "vehicle_id", "customer_id", "request_id", "required_staff_type",
+    "status", "order_time", "finish_time", "remarks"
+)
+
+_COLS = ", ".join(_ORDER_COLUMNS)
+_VALID_COLS = frozenset(_ORDER_COLUMNS)
+
+# 审计序列化按固定字段一次性取值，避免 vars() 遍历和逐个 isinstance 判断
+_AUDIT_GET = attrgetter(*_ORDER_COLUMNS)
+
+# 热点语句的 SQL 文本固定为模块常量，参数交给驱动绑定，服务端可复用执行计划
+_SELECT_BY_ID_SQL = f"SELECT {_COLS} FROM repair_order WHERE order_id = ?"
+_SELECT_BY_CUSTOMER_TMPL = (
+    "SELECT {cols} FROM repair_order WHERE customer_id = ? AND order_id > ? ORDER BY order_id")
+_SELECT_ALL_TMPL = "SELECT {cols} FROM repair_order WHERE order_id > ? ORDER BY order_id"
+_SELECT_PAGE_TMPL = (
+    f"SELECT {_COLS} FROM repair_order ORDER BY {{sort_col}} {{direction}}, order_id {{direction}} "
+    "LIMIT ? OFFSET ?")
+_SELECT_BY_CUSTOMER_SQL = _SELECT_BY_CUSTOMER_TMPL.format(cols=_COLS)
+_SELECT_ALL_SQL = _SELECT_ALL_TMPL.format(cols=_COLS)
+_SELECT_BY_STAFF_SQL = (
+    "SELECT ro.order_id, ro.vehicle_id, ro.customer_id, ro.request_id, "
+    "ro.required_staff_type, ro.status, ro.order_time, ro.finish_time, ro.remarks, "
+    "ra.time_worked "
+    "FROM repair_order ro INNER JOIN repair_assignment ra ON ro.order_id = ra.order_id "
+    "WHERE ra.staff_id = ? AND ra.status = 'accepted'")
+_SELECT_FULL_BY_STAFF_SQL = (
+    "SELECT ro.order_id, ro.vehicle_id, ro.customer_id, ro.request_id, "
+    "ro.required_staff_type, ro.status, ro.order_time, ro.finish_time, ro.remarks, "
+    "ra.time_worked, rr.description, rr.request_time, "
+    "v.license_plate, v.brand, v.model, v.type, v.color "
+    "FROM repair_order ro "
+    "INNER JOIN repair_assignment ra ON ro.order_id = ra.order_id "
+    "LEFT JOIN repair_request rr ON ro.request_id = rr.request_id "
+    "LEFT JOIN vehicle v ON ro.vehicle_id = v.vehicle_id "
+    "WHERE ra.staff_id = ? AND ra.status = 'accepted'")
+# 见 docker/db/migrations/002_sp_create_repair_order.sql：插入订单与审计在一次调用中完成
+_CREATE_SQL = "CALL sp_create_repair_order(?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_UPDATE_STATUS_SQL = "UPDATE repair_order SET status = ? WHERE order_id = ?"
+_UPDATE_STATUS_FINISH_SQL = "UPDATE repair_order SET status = ?, finish_time = ? WHERE order_id = ?"
+_UPDATE_FINISH_TIME_SQL = "UPDATE repair_order SET finish_time = ? WHERE order_id = ?"
+_DELETE_SQL = "DELETE FROM repair_order WHERE order_id = ?"
+
+# get_repair_order_by_id 的短期缓存：容量与存活时间（秒）
+_ORDER_CACHE_SIZE = 2048
+_ORDER_CACHE_TTL = 2.0
+
+# 预先构建枚举值查找表，逐行转换时只做一次 dict 查找
+_STAFF = {m.value: m for m in StaffJobType}
+_STATUS = {m.value: m for m in RepairStatus}
+
+
+def _row_to_order(r) -> RepairOrder:
+    # 绕过 dataclass __init__ 的关键字参数解析，直接按列顺序填充实例字典
+    order = RepairOrder.__new__(RepairOrder)
+    d = order.__dict__
+    d.update(zip(_ORDER_COLUMNS, r))
+    d["required_staff_type"] = _STAFF.get(r[4])
+    d["status"] = _STATUS.get(r[5])
+    return order
+
+
+def _project(fields: Optional[List[str]]) -> tuple:
+    # 只允许白名单中的列名进入 SELECT 列表，防止注入
+    if not fields:
+        return _ORDER_COLUMNS
+    invalid = [f for f in fields if f not in _VALID_COLS]
+    if invalid:
+        raise ValueError(f"Invalid repair order fields: {invalid}")
+    return tuple(fields)
+
+
+def _rows_to_orders(cols: tuple, rows) -> List[RepairOrder]:
+    if cols == _ORDER_COLUMNS:
+        return [_row_to_order(r) for r in rows]
+    # 部分列查询：未选择的字段保持 dataclass 默认值
+    orders = []
+    for r in rows:
+        order = RepairOrder()
+        d = order.__dict__
+        d.update(zip(cols, r))
+        if "required_staff_type" in d:
+            d["required_staff_type"] = _STAFF.get(d["required_staff_type"])
+        if "status" in d:
+            d["status"] = _STATUS.get(d["status"])
+        orders.append(order)
+    return orders
 
 
 class RepairOrderService:
     def __init__(self, db: Database):
         self.db = db
         self.audit_log_service = AuditLogService(db)
+        # order_id -> (expires_at, RepairOrder)，用于合并同一请求内的重复读取
+        self._order_cache: Dict[int, tuple] = {}
 
     def create_repair_order(
         self,
@@ -23,250 +118,243 @@ class RepairOrderService:
         """
         Create a new repair order.
         """
-        now = datetime.now()
+        # 下单时间在客户端生成一次，作为绑定参数写入，SQL 文本中不使用服务端时间函数
+        now = str(datetime.now())
         repair_order = RepairOrder(
             vehicle_id=vehicle_id,
             customer_id=customer_id,
             request_id=request_id,
             required_staff_type=required_staff_type,
             status=status,
-            order_time=str(now),
+            order_time=now,
             remarks=remarks
         )
 
-        # 插入
-        self.db.insert_data(
-            table_name="repair_order",
-            data={
-                "vehicle_id": vehicle_id,
-                "customer_id": customer_id,
-                "request_id": request_id,
-                "required_staff_type": required_staff_type.value,
-                "status": status.value,
-                "order_time": str(now),
-                "remarks": remarks,
-            }
-        )
-
-        # 拉取自增主键
-        row = self.db.execute_query("SELECT LAST_INSERT_ID()")
-        repair_order.order_id = int(row[0][0]) if row else None
-
-        # 审计
-        self.audit_log_service.log_audit_event(
-            table_name="repair_order",
-            record_id=repair_order.order_id,
-            operation=OperationType.INSERT,
-            new_data=self._object_to_dict(repair_order)
-        )
+        # 插入 + 审计 + 返回自增主键由存储过程完成，一次调用、一个事务；
+        # 审计镜像仍由 AuditLogService 序列化，审计关闭时传 NULL
+        audit_data = audit_time = None
+        if self.audit_log_service.is_enabled("repair_order"):
+            audit_data, audit_time = self.audit_log_service.build_insert_audit_image(
+                "repair_order", self._object_to_dict(repair_order))
+        rows = self.db.execute_batch([(
+            _CREATE_SQL,
+            (vehicle_id, customer_id, request_id, required_staff_type.value,
+             status.value, now, remarks, audit_data, audit_time)
+        )])
+        repair_order.order_id = int(rows[0][0]) if rows and rows[0][0] is not None else None
         return repair_order
 
     def get_repair_order_by_id(self, order_id: int) -> Optional[RepairOrder]:
         """
         Get a repair order by ID.
+        Results are cached for a couple of seconds; mutations through this service
+        invalidate the entry. A copy is returned so callers can't alter the cache.
         """
-        rows = self.db.select_data(
-            table_name="repair_order",
-            columns=[
-                "order_id", "vehicle_id", "customer_id",
-                "request_id", "required_staff_type",
-                "status", "order_time", "finish_time", "remarks"
-            ],
-            where=f"order_id = {order_id}",
-        )
+        now = time.monotonic()
+        cached = self._order_cache.get(order_id)
+        if cached and cached[0] > now:
+            return copy.copy(cached[1])
+        rows = self.db.execute_query(_SELECT_BY_ID_SQL, (order_id,))
         if not rows:
             return None
-        r = rows[0]
-        return RepairOrder(
-            order_id=r[0],
-            vehicle_id=r[1],
-            customer_id=r[2],
-            request_id=r[3],
-            required_staff_type=StaffJobType(
-                r[4]) if r[4] is not None else None,
-            status=RepairStatus(r[5]) if r[5] is not None else None,
-            order_time=r[6],
-            finish_time=r[7],
-            remarks=r[8]
-        )
+        order = _row_to_order(rows[0])
+        if len(self._order_cache) >= _ORDER_CACHE_SIZE:
+            # 按插入顺序淘汰最旧的条目
+            self._order_cache.pop(next(iter(self._order_cache)))
+        self._order_cache[order_id] = (now + _ORDER_CACHE_TTL, order)
+        return copy.copy(order)
 
-    def get_repair_orders_by_customer_id(self, customer_id: int) -> List[RepairOrder]:
+    def get_repair_orders_by_customer_id(
+        self,
+        customer_id: int,
+        after_id: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[RepairOrder]:
         """
-        Get all repair orders for a specific customer.
+        Get repair orders for a specific customer, ordered by order_id.
+        Pass `limit` to page with a keyset (order_id > after_id) instead of OFFSET;
+        served by an index on (customer_id, order_id).
+        Pass `fields` to select only those columns; the rest keep their defaults.
         """
-        rows = self.db.select_data(
-            table_name="repair_order",  # 注意：取决于表名，若为 repair_order 则改回
-            columns=[
-                "order_id", "vehicle_id", "customer_id",
-                "request_id", "required_staff_type",
-                "status", "order_time", "finish_time", "remarks"
-            ],
-            where=f"customer_id = {customer_id}",
-        )
-        return [
-            RepairOrder(
-                order_id=r[0],
-                vehicle_id=r[1],
-                customer_id=r[2],
-                request_id=r[3],
-                required_staff_type=StaffJobType(
-                    r[4]) if r[4] is not None else None,
-                status=RepairStatus(r[5]) if r[5] is not None else None,
-                order_time=r[6],
-                finish_time=r[7],
-                remarks=r[8]
-            )
-            for r in rows
-        ]
+        cols = _project(fields)
+        query = _SELECT_BY_CUSTOMER_SQL if cols == _ORDER_COLUMNS \
+            else _SELECT_BY_CUSTOMER_TMPL.format(cols=", ".join(cols))
+        if limit is None:
+            rows = self.db.execute_query(query, (customer_id, after_id))
+        else:
+            rows = self.db.execute_query(query + " LIMIT ?", (customer_id, after_id, limit))
+        return _rows_to_orders(cols, rows)
 
     def get_repair_orders_by_staff_id(self, staff_id: int) -> List[Dict[str, Any]]:
         """
         Get all repair orders assigned to a staff member, including worked hours.
         """
-        rows = self.db.select_data(
-            table_name="repair_order ro",
-            columns=[
-                "ro.order_id", "ro.vehicle_id", "ro.customer_id", "ro.request_id",
-                "ro.required_staff_type", "ro.status", "ro.order_time",
-                "ro.finish_time", "ro.remarks", "ra.time_worked"
-            ],
-            joins=["INNER JOIN repair_assignment ra ON ro.order_id = ra.order_id"],
-            where=f"ra.staff_id = {staff_id} AND ra.status = 'accepted'"
-        )
+        rows = self.db.execute_query(_SELECT_BY_STAFF_SQL, (staff_id,))
         return [
             {
-                "order_id": r[0],
-                "vehicle_id": r[1],
-                "customer_id": r[2],
-                "request_id": r[3],
-                "required_staff_type": StaffJobType(r[4]).value if r[4] else None,
-                "status": RepairStatus(r[5]).value if r[5] else None,
-                "order_time": r[6],
-                "finish_time": r[7],
-                "remarks": r[8],
-                "time_worked": r[9] or 0.0
+                "order_id": r.order_id,
+                "vehicle_id": r.vehicle_id,
+                "customer_id": r.customer_id,
+                "request_id": r.request_id,
+                "required_staff_type": r.required_staff_type,
+                "status": r.status,
+                "order_time": r.order_time,
+                "finish_time": r.finish_time,
+                "remarks": r.remarks,
+                "time_worked": r.time_worked or 0.0
             }
             for r in rows
         ]
 
-    def get_all_repair_orders(self) -> List[RepairOrder]:
+    def get_full_repair_orders_by_staff_id(self, staff_id: int) -> List[Dict[str, Any]]:
         """
-        Get all repair orders in the system.
+        Same as get_repair_orders_by_staff_id, but also eager-loads the originating
+        repair request and the vehicle in the same statement, so callers don't have
+        to look them up per order.
         """
-        rows = self.db.select_data(
-            table_name="repair_order",
-            columns=[
-                "order_id", "vehicle_id", "customer_id", "request_id",
-                "required_staff_type", "status",
-                "order_time", "finish_time", "remarks"
-            ]
-        )
+        rows = self.db.execute_query(_SELECT_FULL_BY_STAFF_SQL, (staff_id,))
         return [
-            RepairOrder(
-                order_id=r[0],
-                vehicle_id=r[1],
-                customer_id=r[2],
-                request_id=r[3],
-                required_staff_type=StaffJobType(
-                    r[4]) if r[4] is not None else None,
-                status=RepairStatus(r[5]) if r[5] is not None else None,
-                order_time=r[6],
-                finish_time=r[7],
-                remarks=r[8]
-            )
+            {
+                "order_id": r.order_id,
+                "vehicle_id": r.vehicle_id,
+                "customer_id": r.customer_id,
+                "request_id": r.request_id,
+                "required_staff_type": r.required_staff_type,
+                "status": r.status,
+                "order_time": r.order_time,
+                "finish_time": r.finish_time,
+                "remarks": r.remarks,
+                "time_worked": r.time_worked or 0.0,
+                "request": {
+                    "description": r.description,
+                    "request_time": r.request_time
+                },
+                "vehicle": {
+                    "license_plate": r.license_plate,
+                    "brand": r.brand,
+                    "model": r.model,
+                    "type": r.type,
+                    "color": r.color
+                }
+            }
             for r in rows
         ]
 
-    def update_repair_order_status(self, order_id: int, status: RepairStatus) -> Optional[RepairOrder]:
+    def get_all_repair_orders(
+        self,
+        after_id: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[RepairOrder]:
         """
-        Update the status of a repair order.
+        Get repair orders in the system, ordered by order_id.
+        Pass `limit` to page with a keyset (order_id > after_id) instead of OFFSET;
+        without it every order is returned, as the statistics endpoints expect.
+        Pass `fields` to select only those columns; the rest keep their defaults.
         """
-        order = self.get_repair_order_by_id(order_id)
-        if not order:
-            return None
+        cols = _project(fields)
+        query = _SELECT_ALL_SQL if cols == _ORDER_COLUMNS \
+            else _SELECT_ALL_TMPL.format(cols=", ".join(cols))
+        if limit is None:
+            rows = self.db.execute_query(query, (after_id,))
+        else:
+            rows = self.db.execute_query(query + " LIMIT ?", (after_id, limit))
+        return _rows_to_orders(cols, rows)
 
-        old = self._object_to_dict(order)
-        order.status = status
+    def get_repair_orders_page(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        sort_col: str = "order_time",
+        descending: bool = True
+    ) -> List[RepairOrder]:
+        """
+        Get one page of repair orders, sorted and sliced on the server.
+        `sort_col` must be a repair_order column; order_id breaks ties so pages are stable.
+        """
+        if sort_col not in _VALID_COLS:
+            raise ValueError(f"Invalid sort column: {sort_col}")
+        query = _SELECT_PAGE_TMPL.format(
+            sort_col=sort_col, direction="DESC" if descending else "ASC")
+        rows = self.db.execute_query(query, (limit, offset))
+        return [_row_to_order(r) for r in rows]
 
-        # 调用 update_data
-        self.db.update_data(
-            table_name="repair_order",
-            data={"status": status.value},
-            where=f"order_id = {order_id}"
-        )
+    def get_all_repair_orders_iter(self) -> Iterator[RepairOrder]:
+        """
+        Stream all repair orders in the system without materializing the result set.
+        """
+        rows = self.db.iter_query(f"SELECT {_COLS} FROM repair_order")
+        for r in rows:
+            yield _row_to_order(r)
 
+    def update_repair_order_status(self, order_id: int, status: RepairStatus) -> Optional[RepairOrder]:
+        """
+        Update the status of a repair order.
+        """
         if status == RepairStatus.COMPLETED:
-            order.finish_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.db.update_data(
-                table_name="repair_order",
-                data={"finish_time": order.finish_time},
-                where=f"order_id = {order_id}"
-            )
-
-        self.audit_log_service.log_audit_event(
-            table_name="repair_order",
-            record_id=order_id,
-            operation=OperationType.UPDATE,
-            old_data=old,
-            new_data=self._object_to_dict(order)
-        )
-        return order
+            finish_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            update = (_UPDATE_STATUS_FINISH_SQL, (status.value, finish_time, order_id))
+        else:
+            update = (_UPDATE_STATUS_SQL, (status.value, order_id))
+        return self._update_with_audit(order_id, update)
 
     def update_repair_order_finish_time(self, order_id: int, finish_time: datetime) -> Optional[RepairOrder]:
         """
         Update the finish time of a repair order.
         """
-        order = self.get_repair_order_by_id(order_id)
-        if not order:
-            return None
-
-        old = self._object_to_dict(order)
-        order.finish_time = finish_time
-
-        self.db.update_data(
-            table_name="repair_order",
-            data={"finish_time": finish_time},
-            where=f"order_id = {order_id}",
-        )
-        self.audit_log_service.log_audit_event(
-            table_name="repair_order",
-            record_id=order_id,
-            operation=OperationType.UPDATE,
-            old_data=old,
-            new_data=self._object_to_dict(order)
+        return self._update_with_audit(
+            order_id,
+            (_UPDATE_FINISH_TIME_SQL, (finish_time, order_id))
         )
-        return order
 
     def delete_repair_order(self, order_id: int) -> Optional[RepairOrder]:
         """
         Delete a repair order by ID.
         """
-        order = self.get_repair_order_by_id(order_id)
-        if not order:
-            return None
+        self._order_cache.pop(order_id, None)
+        # 旧值快照、删除、审计在同一事务中一次发送，无需先单独查询
+        statements = [
+            (_SELECT_BY_ID_SQL, (order_id,)),
+            (_DELETE_SQL, (order_id,)),
+        ]
+        if self.audit_log_service.is_enabled("repair_order"):
+            statements.insert(0, self.audit_log_service.build_snapshot_sql(
+                "audit_old_data", "repair_order", _ORDER_COLUMNS, "order_id", order_id))
+            statements.append(self.audit_log_service.build_snapshot_audit_sql(
+                "repair_order", order_id, OperationType.DELETE, old_data=True))
+        rows = self.db.execute_batch(statements)
+        return _row_to_order(rows[0]) if rows else None
 
-        # 调用 delete_data
-        self.db.delete_data(
-            table_name="repair_order",
-            where=f"order_id = {order_id}",
-        )
-        self.audit_log_service.log_audit_event(
-            table_name="repair_order",
-            record_id=order_id,
-            operation=OperationType.DELETE,
-            old_data=self._object_to_dict(order)
-        )
-        return order
+    def _update_with_audit(self, order_id: int, update: tuple) -> Optional[RepairOrder]:
+        """
+        Run an UPDATE on one repair order together with its audit row in a single batch.
+        The old/new images are captured on the server, and the updated row is returned.
+        The snapshots and the audit row are skipped when auditing repair_order is off.
+        """
+        self._order_cache.pop(order_id, None)
+        if self.audit_log_service.is_enabled("repair_order"):
+            statements = [
+                self.audit_log_service.build_snapshot_sql(
+                    "audit_old_data", "repair_order", _ORDER_COLUMNS, "order_id", order_id),
+                update,
+                self.audit_log_service.build_snapshot_sql(
+                    "audit_new_data", "repair_order", _ORDER_COLUMNS, "order_id", order_id),
+                self.audit_log_service.build_snapshot_audit_sql(
+                    "repair_order", order_id, OperationType.UPDATE, old_data=True, new_data=True),
+                (_SELECT_BY_ID_SQL, (order_id,)),
+            ]
+        else:
+            statements = [update, (_SELECT_BY_ID_SQL, (order_id,))]
+        rows = self.db.execute_batch(statements)
+        return _row_to_order(rows[0]) if rows else None
 
     def _object_to_dict(self, obj: Any) -> Dict[str, Any]:
         if not obj:
             return {}
-        result: Dict[str, Any] = {}
-        for key, val in vars(obj).items():
-            if key.startswith("_"):
-                continue
-            if isinstance(val, (RepairStatus, StaffJobType)):
-                result[key] = val.value
-            else:
-                result[key] = val
+        result = dict(zip(_ORDER_COLUMNS, _AUDIT_GET(obj)))
+        if result["required_staff_type"] is not None:
+            result["required_staff_type"] = result["required_staff_type"].value
+        if result["status"] is not None:
+            result["status"] = result["status"].value
         return result
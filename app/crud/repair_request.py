@@ -2,10 +2,27 @@ from ..db.connection import Database
 from ..models.repair import RepairRequest
 from ..models.enums import OperationType
 from .audit import AuditLogService
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 from datetime import datetime
 
 
+# Fixed SQL text for the hot paths; parameters are bound by the driver so the
+# server can reuse the statement plan across calls.
+# status is coalesced by the server, so row mappers only assign.
+_SELECT_COLUMNS = ("request_id", "vehicle_id", "customer_id", "description",
+                   "COALESCE(status, 'pending') AS status", "request_time")
+_SELECT_BY_ID_SQL = f"SELECT {', '.join(_SELECT_COLUMNS)} FROM repair_request WHERE request_id = ?"
+# Keyset pages in request_id order, served by idx_repair_request_customer
+# (customer_id, request_id); see docker/db/migrations/001_idx_repair_request_customer.sql
+_SELECT_BY_CUSTOMER_SQL = (
+    f"SELECT {', '.join(_SELECT_COLUMNS)} FROM repair_request "
+    "WHERE customer_id = ? AND request_id > ? ORDER BY request_id")
+_SELECT_ALL_SQL = f"SELECT {', '.join(_SELECT_COLUMNS)} FROM repair_request"
+
+
+_row_to_request = RepairRequest.from_row
+
+
 class RepairRequestService:
     def __init__(self, db: Database):
         self.db = db
@@ -27,23 +44,22 @@ class RepairRequestService:
             customer_id=customer_id,
             description=description,
             status=status,
-            request_time=str(datetime.now())  # Use datetime object directly
+            # Client-side timestamp, bound as a parameter like every other value
+            request_time=str(datetime.now())
         )
-        self.db.insert_data("repair_request", {
-            "vehicle_id": vehicle_id,
-            "customer_id": customer_id,
-            "description": description,
-            "status": status,
-            "request_time": repair_request.request_time,
-        })
-        # Use raw query for identity retrieval (if not wrapped)
-        result = self.db.execute_query("SELECT @@IDENTITY AS id")
-        repair_request.request_id = int(result[0][0]) if result else None
-        self.audit_log_service.log_audit_event(
+        # Insert, retrieve the generated id and audit in one transaction and round-trip
+        repair_request.request_id = self.audit_log_service.insert_with_audit(
             table_name="repair_request",
-            record_id=repair_request.request_id,
-            operation=OperationType.INSERT,
+            data={
+                "vehicle_id": vehicle_id,
+                "customer_id": customer_id,
+                "description": description,
+                "status": status,
+                "request_time": repair_request.request_time,
+            },
+            pk_field="request_id",
             new_data=self._object_to_dict(repair_request)
+            if self.audit_log_service.is_enabled("repair_request") else None
         )
         return repair_request
 
@@ -55,24 +71,22 @@ class RepairRequestService:
         Returns:
             Optional[RepairRequest]: The repair request object if found, else None.
         """
-        rows = self.db.select_data(
-            table_name="repair_request",
-            columns=["request_id", "vehicle_id", "customer_id",
-                     "description", "status", "request_time"],
-            where=f"request_id = {request_id}"
-        )
+        rows = self.db.execute_query(_SELECT_BY_ID_SQL, (request_id,))
         if not rows:
             return None
-        row = rows[0]
-        return RepairRequest(
-            request_id=row[0],
-            vehicle_id=row[1],
-            customer_id=row[2],
-            description=row[3],
-            # Default to 'pending' if None
-            status=row[4] if row[4] else "pending",
-            request_time=row[5] if row[5] else None
-        )
+        return _row_to_request(rows[0])
+
+    def get_repair_requests_by_ids(self, request_ids: List[int]) -> Dict[int, RepairRequest]:
+        """
+        Get many repair requests with batched IN queries instead of one
+        get_repair_request_by_id call each.
+        Args:
+            request_ids (List[int]): IDs of the repair requests to retrieve.
+        Returns:
+            Dict[int, RepairRequest]: Repair requests by ID; missing IDs are absent.
+        """
+        rows = self.db.batch_select("repair_request", "request_id", request_ids, list(_SELECT_COLUMNS))
+        return {request_id: _row_to_request(found[0]) for request_id, found in rows.items()}
 
     def get_all_repair_requests(self) -> List[RepairRequest]:
         """
@@ -81,50 +95,39 @@ class RepairRequestService:
         Returns:
             List[RepairRequest]: List of all repair request objects.
         """
-        rows = self.db.select_data(
-            table_name="repair_request",
-            columns=["request_id", "vehicle_id", "customer_id",
-                     "description", "status", "request_time"]
-        )
-        return [
-            RepairRequest(
-                request_id=row[0],
-                vehicle_id=row[1],
-                customer_id=row[2],
-                description=row[3],
-                # Default to 'pending' if None
-                status=row[4] if row[4] else "pending",
-                request_time=row[5] if row[5] else None
-            )
-            for row in rows
-        ] if rows else []
-
-    def get_repair_requests_by_customer_id(self, customer_id: int) -> List[RepairRequest]:
+        return list(self.iter_all_repair_requests())
+
+    def iter_all_repair_requests(self, chunksize: int = 1000) -> Iterator[RepairRequest]:
+        """
+        Stream all repair requests, fetching `chunksize` rows per round-trip
+        instead of materializing the whole table.
+        """
+        for row in self.db.iter_query(_SELECT_ALL_SQL, chunksize=chunksize):
+            yield _row_to_request(row)
+
+    def get_repair_requests_by_customer_id(
+        self,
+        customer_id: int,
+        after_id: int = 0,
+        limit: Optional[int] = None
+    ) -> List[RepairRequest]:
         """
-        Get all repair requests for a specific customer.
+        Get repair requests for a specific customer, ordered by request_id.
+        Pass `limit` to page with a keyset (request_id > after_id) instead of OFFSET,
+        so each page is a bounded range scan on (customer_id, request_id);
+        without it every request of the customer is returned.
         Args:
             customer_id (int): ID of the customer whose requests to retrieve.
+            after_id (int): Last request_id of the previous page; 0 for the first page.
+            limit (Optional[int]): Maximum number of requests to return.
         Returns:
             List[RepairRequest]: List of repair request objects for the customer.
         """
-        rows = self.db.select_data(
-            table_name="repair_request",
-            columns=["request_id", "vehicle_id", "customer_id",
-                     "description", "status", "request_time"],
-            where=f"customer_id = {customer_id}"
-        )
-        return [
-            RepairRequest(
-                request_id=row[0],
-                vehicle_id=row[1],
-                customer_id=row[2],
-                description=row[3],
-                # Default to 'pending' if None
-                status=row[4] if row[4] else "pending",
-                request_time=row[5] if row[5] else None
-            )
-            for row in rows
-        ] if rows else []
+        if limit is None:
+            rows = self.db.execute_query(_SELECT_BY_CUSTOMER_SQL, (customer_id, after_id))
+        else:
+            rows = self.db.execute_query(_SELECT_BY_CUSTOMER_SQL + " LIMIT ?", (customer_id, after_id, limit))
+        return [_row_to_request(row) for row in rows]
 
     def update_repair_request_status(self, request_id: int, new_status: str) -> Optional[RepairRequest]:
         """
@@ -137,28 +140,26 @@ class RepairRequestService:
         Returns:
             Optional[RepairRequest]: The updated repair request object if successful, else None.
         """
-        # Fetch the existing repair request
-        repair_request = self.get_repair_request_by_id(request_id)
-        if not repair_request:
-            return None
-
-        # Store the old data for audit logging
-        old_data = self._object_to_dict(repair_request)
-
-        # Update the status in the object and database
-        repair_request.status = new_status
-        self.db.update_data(
+        # Update and read the old/new images in one round-trip
+        old_row, new_row = self.db.update_returning(
             table_name="repair_request",
             data={"status": new_status},
-            where=f"request_id = {request_id}"
+            where="request_id = ?",
+            where_params=(request_id,),
+            columns=list(_SELECT_COLUMNS)
         )
+        if old_row is None:
+            return None
+        repair_request = _row_to_request(new_row)
+        if not self.audit_log_service.is_enabled("repair_request"):
+            return repair_request
 
         # Log the update action
-        self.audit_log_service.log_audit_event(
+        self.audit_log_service.enqueue(
             table_name="repair_request",
             record_id=request_id,
             operation=OperationType.UPDATE,
-            old_data=old_data,
+            old_data=self._object_to_dict(_row_to_request(old_row)),
             new_data=self._object_to_dict(repair_request)
         )
 
@@ -167,4 +168,4 @@ class RepairRequestService:
     def _object_to_dict(self, obj: Any) -> Dict[str, Any]:
         if not obj:
             return {}
-        return {key: value for key, value in vars(obj).items() if not key.startswith("_")}
+        return {key: getattr(obj, key) for key in obj._AUDIT_FIELDS}
@@ -1,10 +1,51 @@
 from ..db.connection import Database
 from ..models.user import User, Admin, Staff, Customer
-from ..models.enums import StaffJobType, OperationType
+from ..models.enums import OperationType
 from .audit import AuditLogService
-from ..core.security import get_password_hash
+from ..core.security import get_password_hash, hash_passwords
 from ..schemas.auth import UserCreate, StaffCreate
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
+import copy
+
+
+# 批量创建时每个批次（一次往返）最多插入的用户数
+_BULK_PAGE_SIZE = 100
+
+
+# user columns plus the staff details, LEFT JOINed so staff rows need no follow-up query
+_USER_COLUMNS = ("u.user_id", "u.name", "u.username", "u.password", "u.phone",
+                 "u.email", "u.address", "u.discriminator", "s.jobtype", "s.hourly_rate")
+_STAFF_JOIN = ("LEFT JOIN staff s ON u.user_id = s.staff_id",)
+_SELECT_USER_SQL = f"SELECT {', '.join(_USER_COLUMNS)} FROM user u {' '.join(_STAFF_JOIN)}"
+_SELECT_USER_BY_ID_SQL = f"{_SELECT_USER_SQL} WHERE u.user_id = ? LIMIT 1"
+_SELECT_USER_BY_USERNAME_SQL = f"{_SELECT_USER_SQL} WHERE u.username = ? LIMIT 1"
+_SELECT_STAFF_SQL = (
+    f"SELECT {', '.join(_USER_COLUMNS)} FROM user u "
+    "INNER JOIN staff s ON u.user_id = s.staff_id WHERE u.discriminator = 'staff'")
+
+
+def _user_fields(row) -> Dict[str, Any]:
+    return {
+        "user_id": row[0], "name": row[1], "username": row[2],
+        "password": row[3], "phone": row[4], "email": row[5],
+        "address": row[6], "discriminator": row[7]
+    }
+
+
+def _map_admin(row) -> Admin:
+    return Admin(**_user_fields(row))
+
+
+def _map_customer(row) -> Customer:
+    return Customer(**_user_fields(row))
+
+
+def _map_user(row) -> User:
+    return User(**_user_fields(row))
+
+
+# discriminator -> row mapper; staff details come from the LEFT JOIN in _USER_COLUMNS
+_MAPPERS = {"admin": _map_admin, "staff": Staff.from_row, "customer": _map_customer}
 
 
 class UserService:
@@ -12,61 +53,35 @@ class UserService:
         self.db = db
         self.audit_log_service = AuditLogService(db)
 
+    def with_request_cache(self) -> "UserService":
+        """
+        Return a UserService whose user lookups are memoized for its lifetime.
+        Meant to live for one HTTP request (see dependencies.get_user_service).
+        """
+        return _RequestCachedUserService(self.db)
+
     def get_user_by_username(self, username: str) -> Optional[User]:
-        rows = self.db.select_data(
-            table_name="user",
-            columns=["user_id", "name", "username", "password",
-                     "phone", "email", "address", "discriminator"],
-            where=f"username = '{username}'",
-            limit=1
-        )
-        print(rows)
+        rows = self.db.execute_query(_SELECT_USER_BY_USERNAME_SQL, (username,))
         return self._map_user_row_to_object(rows[0]) if rows else None
 
     def get_user_by_id(self, user_id: int) -> Optional[User]:
-        print(type(user_id))
-        rows = self.db.select_data(
-            table_name="user",
-            columns=["user_id", "name", "username", "password",
-                     "phone", "email", "address", "discriminator"],
-            where=f"user_id = {user_id}",
-            limit=1
-        )
+        rows = self.db.execute_query(_SELECT_USER_BY_ID_SQL, (user_id,))
         return self._map_user_row_to_object(rows[0]) if rows else None
 
     def get_all_users(self) -> List[User]:
-        rows = self.db.select_data(
-            table_name="user",
-            columns=["user_id", "name", "username", "password",
-                     "phone", "email", "address", "discriminator"]
-        )
-        return [self._map_user_row_to_object(row) for row in rows]
+        return list(self.iter_all_users())
+
+    def iter_all_users(self, chunksize: int = 1000) -> Iterator[User]:
+        """
+        Stream all users, fetching `chunksize` rows per round-trip instead of
+        materializing the whole table.
+        """
+        for row in self.db.iter_query(_SELECT_USER_SQL, chunksize=chunksize):
+            yield self._map_user_row_to_object(row)
 
     def get_all_staff(self) -> List[Staff]:
-        rows = self.db.select_data(
-            table_name="user u",
-            columns=["u.user_id", "u.name", "u.username", "u.password", "u.phone", "u.email", "u.address", "u.discriminator",
-                     "s.jobtype", "s.hourly_rate"],
-            joins=["INNER JOIN staff s ON u.user_id = s.staff_id"],
-            where="u.discriminator = 'staff'"
-        )
-        staff_list: List[Staff] = []
-        for row in rows:
-            data = {
-                "user_id": row[0],
-                "name": row[1],
-                "username": row[2],
-                "password": row[3],
-                "phone": row[4],
-                "email": row[5],
-                "address": row[6],
-                "discriminator": row[7],
-                "staff_id": row[0],
-                "jobtype": StaffJobType(row[8]) if row[8] else None,
-                "hourly_rate": row[9] or 0
-            }
-            staff_list.append(Staff(**data))
-        return staff_list
+        rows = self.db.execute_query(_SELECT_STAFF_SQL)
+        return [Staff.from_row(row) for row in rows]
 
     def create_customer(self, user: UserCreate) -> Customer:
         hashed = get_password_hash(user.password)
@@ -79,27 +94,9 @@ class UserService:
             address=user.address
         )
 
-        print(customer.asdict(only_parent=True))
-
-        self.db.insert_data(
-            table_name="user",
-            data=customer.asdict(only_parent=True)
-        )
-        row = self.db.execute_query("SELECT LAST_INSERT_ID();")
-        customer.user_id = int(row[0][0]) if row else None
+        customer.user_id = self._insert_user_with_role(
+            customer, "customer", "customer_id")
         customer.customer_id = customer.user_id
-
-        self.db.insert_data(table_name="customer", data={
-            "customer_id": customer.customer_id
-        })
-
-        self.audit_log_service.log_audit_event(
-            table_name="user",
-            record_id=customer.user_id,
-            operation=OperationType.INSERT,
-            new_data=customer.asdict()
-
-        )
         return customer
 
     def create_admin(self, user: UserCreate) -> Admin:
@@ -112,24 +109,8 @@ class UserService:
             email=user.email,
             address=user.address
         )
-        self.db.insert_data(
-            table_name="user",
-            data=admin.asdict(only_parent=True)
-        )
-        row = self.db.execute_query("SELECT LAST_INSERT_ID();")
-        admin.user_id = int(row[0][0]) if row else None
+        admin.user_id = self._insert_user_with_role(admin, "admin", "admin_id")
         admin.admin_id = admin.user_id
-
-        self.db.insert_data(table_name="admin", data={
-            "admin_id": admin.admin_id
-        })
-
-        self.audit_log_service.log_audit_event(
-            table_name="user",
-            record_id=admin.user_id,
-            operation=OperationType.INSERT,
-            new_data=admin.asdict()
-        )
         return admin
 
     def create_staff(self, user: StaffCreate) -> Staff:
@@ -144,28 +125,50 @@ class UserService:
             jobtype=user.jobtype,
             hourly_rate=user.hourly_rate
         )
-        # Insert into user table
-        self.db.insert_data(
-            table_name="user",
-            data=staff.asdict(only_parent=True)
+        # Insert user + staff details + audit in one transaction and round-trip
+        staff.user_id = self._insert_user_with_role(
+            staff, "staff", "staff_id",
+            {"jobtype": staff.jobtype.value if staff.jobtype else None,
+             "hourly_rate": staff.hourly_rate}
         )
-        row = self.db.execute_query("SELECT LAST_INSERT_ID();")
-        staff.user_id = int(row[0][0]) if row else None
         staff.staff_id = staff.user_id
-        # Insert into staff details
-        self.db.insert_data(
-            table_name="staff",
-            data={"staff_id": staff.staff_id, "jobtype": staff.jobtype.value if staff.jobtype else None,
-                  "hourly_rate": staff.hourly_rate}
-        )
-        self.audit_log_service.log_audit_event(
-            table_name="user",
-            record_id=staff.user_id,
-            operation=OperationType.INSERT,
-            new_data=staff.asdict()
-        )
         return staff
 
+    def create_customers(self, users: List[UserCreate]) -> List[Customer]:
+        """
+        Create many customers in one transaction, _BULK_PAGE_SIZE users
+        (user rows, customer rows and audit events) per round-trip.
+        Passwords are hashed in parallel.
+        """
+        customers = [
+            Customer(name=u.name, username=u.username, password=hashed,
+                     phone=u.phone, email=u.email, address=u.address)
+            for u, hashed in zip(users, self._hash_passwords(users))
+        ]
+        for customer, user_id in zip(customers, self._bulk_insert_users_with_role(
+                customers, "customer", "customer_id", [{} for _ in customers])):
+            customer.user_id = customer.customer_id = user_id
+        return customers
+
+    def create_staff_bulk(self, users: List[StaffCreate]) -> List[Staff]:
+        """
+        Create many staff members, see create_customers.
+        """
+        staff_list = [
+            Staff(name=u.name, username=u.username, password=hashed,
+                  phone=u.phone, email=u.email, address=u.address,
+                  jobtype=u.jobtype, hourly_rate=u.hourly_rate)
+            for u, hashed in zip(users, self._hash_passwords(users))
+        ]
+        role_rows = [
+            {"jobtype": s.jobtype.value if s.jobtype else None, "hourly_rate": s.hourly_rate}
+            for s in staff_list
+        ]
+        for staff, user_id in zip(staff_list, self._bulk_insert_users_with_role(
+                staff_list, "staff", "staff_id", role_rows)):
+            staff.user_id = staff.staff_id = user_id
+        return staff_list
+
     def update_user_info(
         self,
         user_id: int,
@@ -180,104 +183,177 @@ class UserService:
         Update any fields of user (name, email, address, phone, username, password...)
         Only non-None fields will be updated.
         """
-        user = self.get_user_by_id(user_id)
-        if not user:
-            return None
-        old = user.asdict()
         data = {}
         # Only update if not None
         if name is not None:
-            user.name = name
             data["name"] = name
         if email is not None:
-            user.email = email
             data["email"] = email
         if address is not None:
-            user.address = address
             data["address"] = address
         if phone is not None:
-            user.phone = phone
             data["phone"] = phone
         if username is not None:
-            user.username = username
             data["username"] = username
         if password is not None:
-            password = get_password_hash(password)
-            user.password = password
-            data["password"] = password
+            data["password"] = get_password_hash(password)
 
         if not data:
             # 没有任何字段需要更新
-            return user
+            return self.get_user_by_id(user_id)
 
-        self.db.update_data(table_name="user", data=data,
-                            where=f"user_id = {user_id}")
+        # 更新并在同一次往返中取回更新前后的行，供审计和返回使用
+        old_row, new_row = self.db.update_returning(
+            table_name="user u", data=data,
+            where="u.user_id = ?", where_params=(user_id,),
+            columns=_USER_COLUMNS, joins=_STAFF_JOIN)
+        if old_row is None:
+            return None
+        user = self._map_user_row_to_object(new_row)
+        if not self.audit_log_service.is_enabled("user"):
+            return user
 
-        self.audit_log_service.log_audit_event(
+        self.audit_log_service.enqueue(
             table_name="user",
             record_id=user_id,
             operation=OperationType.UPDATE,
-            old_data=old,
-            new_data=user.asdict()
+            old_data=self._object_to_dict(self._map_user_row_to_object(old_row)),
+            new_data=self._object_to_dict(user)
         )
-        return self.get_user_by_id(user_id)  # 刷新后的最新对象
+        return user
 
     def delete_user(self, user_id: int) -> bool:
         """
         删除用户，级联清理子表（admin/staff/customer），自动审计。
+        读取旧行（加锁）、删除子表与主表在同一事务、同一次往返中完成。
         :param user_id: 用户ID
         :return: 删除成功返回 True，否则 False
         """
-        user = self.get_user_by_id(user_id)
-        if not user:
+        result_sets = self.db.execute_batch_results([
+            (f"{_SELECT_USER_BY_ID_SQL} FOR UPDATE", (user_id,)),
+            # 只有与 discriminator 对应的子表有行，其余两条按主键删除 0 行
+            ("DELETE FROM admin WHERE admin_id = ?", (user_id,)),
+            ("DELETE FROM staff WHERE staff_id = ?", (user_id,)),
+            ("DELETE FROM customer WHERE customer_id = ?", (user_id,)),
+            ("DELETE FROM user WHERE user_id = ?", (user_id,)),
+        ])
+        old_rows = result_sets[0] if result_sets else []
+        if not old_rows:
             return False
 
-        # 清理角色对应子表
-        if user.discriminator == "admin":
-            self.db.delete_data(table_name="admin",
-                                where=f"admin_id = {user_id}")
-        elif user.discriminator == "staff":
-            self.db.delete_data(table_name="staff",
-                                where=f"staff_id = {user_id}")
-        elif user.discriminator == "customer":
-            self.db.delete_data(table_name="customer",
-                                where=f"customer_id = {user_id}")
-
-        # 主user表
-        deleted = self.db.delete_data(
-            table_name="user", where=f"user_id = {user_id}")
-
         # 审计日志
-        if deleted:
-            self.audit_log_service.log_audit_event(
+        if self.audit_log_service.is_enabled("user"):
+            self.audit_log_service.enqueue(
                 table_name="user",
                 record_id=user_id,
                 operation=OperationType.DELETE,
-                old_data=user.asdict(),
+                old_data=self._object_to_dict(self._map_user_row_to_object(old_rows[0])),
                 new_data=None
             )
-        return bool(deleted)
+        return True
+
+    def _insert_user_with_role(self, user: User, role_table: str, role_pk: str, role_data: Dict[str, Any] = None) -> Optional[int]:
+        """
+        Insert the user row, its role row (admin/staff/customer) keyed by the new
+        user_id, and the INSERT audit event as one batch, and return the user_id.
+        """
+        rows = self.db.execute_batch(self._user_with_role_statements(user, role_table, role_pk, role_data))
+        return int(rows[0][0]) if rows and rows[0][0] is not None else None
+
+    def _user_with_role_statements(self, user: User, role_table: str, role_pk: str, role_data: Dict[str, Any] = None) -> List[tuple]:
+        """
+        Statements inserting one user and its role row; the new user_id is taken
+        from LAST_INSERT_ID() right after the user INSERT and selected last.
+        """
+        role_data = role_data or {}
+        role_columns = ", ".join([role_pk, *role_data.keys()])
+        role_values = ", ".join(["@last_insert_id", *("?" for _ in role_data)])
+        statements = [
+            self.db.build_insert("user", user.asdict(only_parent=True)),
+            ("SET @last_insert_id = LAST_INSERT_ID()", ()),
+            (f"INSERT INTO {role_table} ({role_columns}) VALUES ({role_values})",
+             tuple(role_data.values())),
+            ("SELECT @last_insert_id", ()),
+        ]
+        if self.audit_log_service.is_enabled("user"):
+            statements.insert(3, self.audit_log_service.build_insert_audit_sql(
+                "user", self._object_to_dict(user), ("user_id", role_pk)))
+        return statements
+
+    def _object_to_dict(self, obj: Any) -> Dict[str, Any]:
+        # 审计快照不记录密码哈希
+        if not obj:
+            return {}
+        data = obj.asdict()
+        data.pop("password", None)
+        return data
+
+    def _hash_passwords(self, users: List[UserCreate]) -> List[str]:
+        # bcrypt 是 CPU 密集型且会释放 GIL，在共享的哈希线程池中并行计算
+        return hash_passwords(u.password for u in users)
+
+    def _bulk_insert_users_with_role(self, users: List[User], role_table: str, role_pk: str, role_rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Bulk counterpart of _insert_user_with_role: every user is inserted with its
+        own statements and LAST_INSERT_ID(), _BULK_PAGE_SIZE users per round-trip,
+        all in one transaction. Returns the user_ids in input order.
+        """
+        ids: List[int] = []
+        with self.db.transaction():
+            for start in range(0, len(users), _BULK_PAGE_SIZE):
+                statements = []
+                for user, role_data in zip(users[start:start + _BULK_PAGE_SIZE],
+                                           role_rows[start:start + _BULK_PAGE_SIZE]):
+                    statements.extend(self._user_with_role_statements(user, role_table, role_pk, role_data))
+                ids.extend(int(rs[0][0]) for rs in self.db.execute_batch_results(statements))
+        return ids
 
     def _map_user_row_to_object(self, row: tuple) -> User:
-        disc = row[7]
-        base = {
-            "user_id": row[0], "name": row[1], "username": row[2],
-            "password": row[3], "phone": row[4], "email": row[5],
-            "address": row[6], "discriminator": disc
-        }
-        if disc == "admin":
-            return Admin(**base)
-        if disc == "staff":
-            details = self.db.select_data(
-                table_name="staff",
-                columns=["jobtype", "hourly_rate"],
-                where=f"staff_id = {row[0]}",
-                limit=1
-            )
-            if details:
-                base.update({"staff_id": row[0], "jobtype": StaffJobType(
-                    details[0][0]), "hourly_rate": details[0][1] or 0})
-            return Staff(**base)
-        if disc == "customer":
-            return Customer(**base)
-        return User(**base)
+        return _MAPPERS.get(row[7], _map_user)(row)
+
+
+class _RequestCachedUserService(UserService):
+    """
+    UserService that memoizes get_user_by_id / get_user_by_username in plain dicts,
+    so repeated lookups within one request (auth, permission checks, handler)
+    hit the database once. Cached users are copied on the way out.
+    """
+
+    def __init__(self, db: Database):
+        super().__init__(db)
+        self._by_id: Dict[int, Optional[User]] = {}
+        self._by_username: Dict[str, Optional[User]] = {}
+
+    def get_user_by_id(self, user_id: int) -> Optional[User]:
+        if user_id not in self._by_id:
+            self._remember(super().get_user_by_id(user_id), user_id=user_id)
+        return copy.copy(self._by_id[user_id])
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        if username not in self._by_username:
+            self._remember(super().get_user_by_username(username), username=username)
+        return copy.copy(self._by_username[username])
+
+    def update_user_info(self, user_id: int, **kwargs) -> Optional[User]:
+        self._forget(user_id)
+        user = super().update_user_info(user_id, **kwargs)
+        self._forget(user_id)
+        return user
+
+    def delete_user(self, user_id: int) -> bool:
+        self._forget(user_id)
+        return super().delete_user(user_id)
+
+    def _remember(self, user: Optional[User], user_id: int = None, username: str = None) -> None:
+        if user_id is not None:
+            self._by_id[user_id] = user
+        if username is not None:
+            self._by_username[username] = user
+        if user is not None:
+            self._by_id[user.user_id] = user
+            self._by_username[user.username] = user
+
+    def _forget(self, user_id: int) -> None:
+        user = self._by_id.pop(user_id, None)
+        if user is not None:
+            self._by_username.pop(user.username, None)
@@ -3,8 +3,41 @@ from ..db.connection import Database
 from ..models.customer import Vehicle
 from ..models.enums import VehicleBrand, VehicleType, VehicleColor, OperationType
 from .audit import AuditLogService
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 from datetime import datetime
+from operator import attrgetter
+
+
+def _enum_value(value):
+    # Enum -> its value; None and plain strings pass through unchanged
+    return getattr(value, "value", value)
+
+
+# 审计序列化分派表：普通字段一次性按 attrgetter 取值，枚举字段按表中的转换函数处理
+_PLAIN_FIELDS = ("vehicle_id", "customer_id", "license_plate", "model", "remarks")
+_GET_PLAIN = attrgetter(*_PLAIN_FIELDS)
+_AUDIT_TRANSFORMS = (
+    ("brand", _enum_value),
+    ("type", _enum_value),
+    ("color", _enum_value),
+)
+
+
+_VEHICLE_COLUMNS = ("vehicle_id", "customer_id", "license_plate",
+                    "brand", "model", "type", "color", "remarks")
+
+
+# value -> member lookup tables; unknown or NULL values map to None,
+# without going through Enum.__call__ for every row
+_BRAND_MAP = VehicleBrand._value2member_map_
+_TYPE_MAP = VehicleType._value2member_map_
+_COLOR_MAP = VehicleColor._value2member_map_
+
+
+def _row_to_vehicle(r) -> Vehicle:
+    # positional, in Vehicle field order (same as _VEHICLE_COLUMNS)
+    return Vehicle(r[0], r[1], r[2], _BRAND_MAP.get(r[3]), r[4],
+                   _TYPE_MAP.get(r[5]), _COLOR_MAP.get(r[6]), r[7])
 
 
 class VehicleService:
@@ -37,22 +70,13 @@ class VehicleService:
             # created_at=created_at  # if your model has a timestamp
         )
 
-        # 插入
-        self.db.insert_data(
+        # 插入、获取自增主键并写审计：同一事务、同一次往返
+        vehicle.vehicle_id = self.audit_log_service.insert_with_audit(
             table_name="vehicle",
-            data=vehicle.asdict()
-        )
-
-        # 获取自增主键
-        row = self.db.execute_query("SELECT LAST_INSERT_ID()")
-        vehicle.vehicle_id = int(row[0][0]) if row else None
-
-        # 审计
-        self.audit_log_service.log_audit_event(
-            table_name="vehicle",
-            record_id=vehicle.vehicle_id,
-            operation=OperationType.INSERT,
+            data=vehicle.asdict(),
+            pk_field="vehicle_id",
             new_data=self._object_to_dict(vehicle)
+            if self.audit_log_service.is_enabled("vehicle") else None
         )
 
         return vehicle
@@ -63,33 +87,21 @@ class VehicleService:
         """
         rows = self.db.select_data(
             table_name="vehicle",
-            columns=[
-                "vehicle_id", "customer_id", "license_plate",
-                "brand", "model", "type", "color", "remarks"
-            ],
-            where=f"vehicle_id = {vehicle_id}",
+            columns=list(_VEHICLE_COLUMNS),
+            where="vehicle_id = ?", where_params=(vehicle_id,),
         )
         if not rows:
             return None
+        return _row_to_vehicle(rows[0])
 
-        r = rows[0]
-
-        def safe_enum(cls, val):
-            try:
-                return cls(val) if val is not None else None
-            except ValueError:
-                return None
-        return Vehicle(
-            vehicle_id=r[0],
-            customer_id=r[1],
-            license_plate=r[2],
-            brand=safe_enum(VehicleBrand, r[3]),
-            model=r[4],
-            type=safe_enum(VehicleType, r[5]),
-            color=safe_enum(VehicleColor, r[6]),
-            remarks=r[7],
-            # created_at=r[8]
-        )
+    def vehicle_exists(self, vehicle_id: int, customer_id: Optional[int] = None) -> bool:
+        """
+        Check that a vehicle exists (and, if given, belongs to `customer_id`)
+        without loading it.
+        """
+        if customer_id is None:
+            return self.db.exists("vehicle", "vehicle_id = ?", (vehicle_id,))
+        return self.db.exists("vehicle", "vehicle_id = ? AND customer_id = ?", (vehicle_id, customer_id))
 
     def get_vehicles_by_customer_id(self, customer_id: int) -> List[Vehicle]:
         """
@@ -97,66 +109,40 @@ class VehicleService:
         """
         rows = self.db.select_data(
             table_name="vehicle",
-            columns=[
-                "vehicle_id", "customer_id", "license_plate",
-                "brand", "model", "type", "color", "remarks"
-            ],
-            where=f"customer_id = {customer_id}",
+            columns=list(_VEHICLE_COLUMNS),
+            where="customer_id = ?", where_params=(customer_id,),
             order_by="vehicle_id ASC"
         )
-
-        def safe_enum(cls, val):
-            try:
-                return cls(val) if val is not None else None
-            except ValueError:
-                return None
-
-        return [
-            Vehicle(
-                vehicle_id=r[0],
-                customer_id=r[1],
-                license_plate=r[2],
-                brand=safe_enum(VehicleBrand, r[3]),
-                model=r[4],
-                type=safe_enum(VehicleType, r[5]),
-                color=safe_enum(VehicleColor, r[6]),
-                remarks=r[7],
-                # created_at=r[8]
-            )
-            for r in rows
-        ]
+        return [_row_to_vehicle(r) for r in rows]
 
     def get_all_vehicles(self) -> List[Vehicle]:
         """
         Get all vehicles in the system.
         """
-        rows = self.db.select_data(
-            table_name="vehicle",
-            columns=[
-                "vehicle_id", "customer_id", "license_plate",
-                "brand", "model", "type", "color", "remarks"
-            ]
-        )
+        return list(self.iter_all_vehicles())
 
-        def safe_enum(cls, val):
-            try:
-                return cls(val) if val is not None else None
-            except Exception:
-                return None
-        return [
-            Vehicle(
-                vehicle_id=r[0],
-                customer_id=r[1],
-                license_plate=r[2],
-                brand=safe_enum(VehicleBrand, r[3]),
-                model=r[4],
-                type=safe_enum(VehicleType, r[5]),
-                color=safe_enum(VehicleColor, r[6]),
-                remarks=r[7],
-                # created_at=r[8]
-            )
-            for r in rows
-        ]
+    def iter_all_vehicles(self, chunksize: int = 1000) -> Iterator[Vehicle]:
+        """
+        Stream all vehicles, fetching `chunksize` rows per round-trip instead of
+        materializing the whole table.
+        """
+        for r in self.db.iter_rows("vehicle", list(_VEHICLE_COLUMNS), chunksize=chunksize):
+            yield _row_to_vehicle(r)
+
+    def get_all_vehicles_columnar(self) -> Dict[str, tuple]:
+        """
+        Get all vehicles as columns instead of Vehicle objects, for analytics
+        readers that scan one or two fields over the whole table.
+        Returns:
+            Dict[str, tuple]: One tuple per column in _VEHICLE_COLUMNS, all of the
+                same length; brand/type/color are decoded to their enum members (or None).
+        """
+        rows = self.db.execute_query(f"SELECT {', '.join(_VEHICLE_COLUMNS)} FROM vehicle")
+        # 转置为列：zip 在 C 层完成，无需逐行构造对象
+        columns = dict(zip(_VEHICLE_COLUMNS, zip(*rows))) if rows else {c: () for c in _VEHICLE_COLUMNS}
+        for name, lookup in (("brand", _BRAND_MAP), ("type", _TYPE_MAP), ("color", _COLOR_MAP)):
+            columns[name] = tuple(map(lookup.get, columns[name]))
+        return columns
 
     def update_vehicle(
         self,
@@ -172,51 +158,54 @@ class VehicleService:
         """
         Update fields of an existing vehicle.
         """
-        original = self.get_vehicle_by_id(vehicle_id)
-        if not original:
-            return None
-        old_data = self._object_to_dict(original)
-
         updates: Dict[str, Any] = {}
         if license_plate is not None:
             updates["license_plate"] = license_plate
-            original.license_plate = license_plate
         if brand is not None:
             updates["brand"] = brand.value
-            original.brand = brand
         if model is not None:
             updates["model"] = model
-            original.model = model
         if type is not None:
             updates["type"] = type.value
-            original.type = type
         if color is not None:
             updates["color"] = color.value
-            original.color = color
         if remarks is not None:
             updates["remarks"] = remarks
-            original.remarks = remarks
 
-        if updates:
-            self.db.update_data(
-                table_name="vehicle",
-                data=updates,
-                where=f"vehicle_id = {vehicle_id}",
-            )
+        if not updates:
+            return self.get_vehicle_by_id(vehicle_id)
+
+        # 更新并在同一次往返中取回更新前后的行，无需先查询再更新
+        old_row, new_row = self.db.update_returning(
+            table_name="vehicle", data=updates,
+            where="vehicle_id = ?", where_params=(vehicle_id,),
+            columns=list(_VEHICLE_COLUMNS))
+        if old_row is None:
+            return None
+        vehicle = _row_to_vehicle(new_row)
+
+        if self.audit_log_service.is_enabled("vehicle"):
             self.audit_log_service.log_audit_event(
                 table_name="vehicle",
                 record_id=vehicle_id,
                 operation=OperationType.UPDATE,
-                old_data=old_data,
-                new_data=self._object_to_dict(original)
+                old_data=self._object_to_dict(_row_to_vehicle(old_row)),
+                new_data=self._object_to_dict(vehicle)
             )
-        return original
+        return vehicle
 
     def delete_vehicle(self, vehicle_id: int) -> bool:
         """
         Delete a vehicle by ID.
         Returns True if the vehicle existed and was deleted.
         """
+        if not self.audit_log_service.is_enabled("vehicle"):
+            # 无需旧数据，DELETE 的影响行数即可判断是否存在
+            return bool(self.db.delete_data(
+                table_name="vehicle",
+                where="vehicle_id = ?", where_params=(vehicle_id,),
+            ))
+
         original = self.get_vehicle_by_id(vehicle_id)
         if not original:
             return False
@@ -224,7 +213,7 @@ class VehicleService:
 
         deleted = self.db.delete_data(
             table_name="vehicle",
-            where=f"vehicle_id = {vehicle_id}",
+            where="vehicle_id = ?", where_params=(vehicle_id,),
         )
         if deleted:
             self.audit_log_service.log_audit_event(
@@ -240,12 +229,7 @@ class VehicleService:
         """
         Convert a Vehicle object to dict for audit logging.
         """
-        result: Dict[str, Any] = {}
-        for key, val in vars(obj).items():
-            if key.startswith("_"):
-                continue
-            if isinstance(val, (VehicleBrand, VehicleType, VehicleColor)):
-                result[key] = val.value
-            else:
-                result[key] = val
+        result = dict(zip(_PLAIN_FIELDS, _GET_PLAIN(obj)))
+        for name, transform in _AUDIT_TRANSFORMS:
+            result[name] = transform(getattr(obj, name))
         return result
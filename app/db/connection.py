@@ -1,11 +1,129 @@
 import pyodbc
-from contextlib import contextmanager
-from typing import Tuple, List, Any
+import threading
+import time
+from collections import deque, OrderedDict, defaultdict
+from contextlib import contextmanager, closing
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Tuple, List, Any, Iterator, Optional, Dict, Iterable, Callable
 import logging
 
-# Set up logging for database operations
-logging.basicConfig(level=logging.INFO)
+# Let the ODBC driver manager pool connections as well
+pyodbc.pooling = True
+
+# 日志配置交给应用入口（见 app/main.py），导入本模块不修改根 logger
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+@lru_cache(maxsize=512)
+def _build_select_sql(
+    table_name: str,
+    columns: Tuple[str, ...],
+    where: str,
+    order_by: str,
+    has_limit: bool,
+    has_offset: bool,
+    distinct: bool,
+    group_by: str,
+    having: str,
+    joins: Tuple[str, ...]
+) -> str:
+    """
+    Build the SELECT text for Database.select_data. Values are always bound as
+    parameters, so the text depends only on the call site and is memoized.
+    """
+    columns_sql = ", ".join(columns) if columns else "*"
+    query = f"SELECT {'DISTINCT ' if distinct else ''}{columns_sql} FROM {table_name}"
+    if joins:
+        for join in joins:
+            query += f" {join}"
+    if where:
+        query += f" WHERE {where}"
+    if group_by:
+        query += f" GROUP BY {group_by}"
+    if having:
+        query += f" HAVING {having}"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    if has_limit:
+        query += " LIMIT ?"
+        if has_offset:
+            query += " OFFSET ?"
+    return query
+
+
+# 多行 INSERT 每条语句的行数上限；同时不超过 MySQL 预处理语句 65535 个占位符的限制
+_INSERT_CHUNK_ROWS = 1000
+_MAX_PLACEHOLDERS = 65535
+
+# 流式读取（iter_query / select_data(stream=True)）时每次 fetchmany 的行数
+_FETCH_CHUNK_ROWS = 1000
+
+
+# 每个连接缓存的语句（游标）数上限
+_STMT_CACHE_SIZE = 64
+
+
+def _insert_chunk_size(columns: int) -> int:
+    return max(1, min(_INSERT_CHUNK_ROWS, _MAX_PLACEHOLDERS // max(columns, 1)))
+
+
+def _flat_values(rows: List[dict], columns: Tuple[str, ...]) -> Tuple[Any, ...]:
+    """
+    Flatten `columns` of every row into one parameter tuple for a multi-row INSERT;
+    a column missing from a row is bound as NULL.
+    """
+    try:
+        if len(columns) == 1:
+            return tuple(map(itemgetter(columns[0]), rows))
+        return tuple(chain.from_iterable(map(itemgetter(*columns), rows)))
+    except KeyError:
+        return tuple(row.get(col) for row in rows for col in columns)
+
+
+def _input_sizes(rows: List[Tuple[Any, ...]]) -> List[Optional[Tuple[int, int, int]]]:
+    """
+    setinputsizes() descriptors for executemany over `rows`: character columns
+    are bound at their widest value up front, so fast_executemany allocates each
+    column buffer once instead of re-binding when a longer value shows up.
+    Other columns keep the driver's default (None).
+    """
+    sizes = []
+    for values in zip(*rows):
+        if any(type(value) is str for value in values):
+            width = max((len(value) for value in values if type(value) is str), default=1)
+            sizes.append((pyodbc.SQL_WVARCHAR, max(width, 1), 0))
+        else:
+            sizes.append(None)
+    return sizes
+
+
+@lru_cache(maxsize=256)
+def _build_insert_sql(table_name: str, columns: Tuple[str, ...], rows: int = 1) -> str:
+    """
+    Build a parameterized INSERT of `rows` rows over `columns`; memoized, since
+    the text depends only on the table and the column set.
+    """
+    placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {', '.join(placeholders for _ in range(rows))}"
+
+
+@lru_cache(maxsize=256)
+def _build_update_sql(table_name: str, columns: Tuple[str, ...], where: str) -> str:
+    """
+    Build a parameterized UPDATE of `columns`, memoized like _build_insert_sql.
+    """
+    return f"UPDATE {table_name} SET {', '.join(f'{c} = ?' for c in columns)} WHERE {where}"
+
+
+def _no_validation() -> None:
+    pass
+
+
+class _TxState(threading.local):
+    conn: Optional[pyodbc.Connection] = None
+
 
 class Database:
     server: str = None
@@ -14,65 +132,231 @@ class Database:
     username: str = None
     password: str = None
     driver: str = None
-    conn: pyodbc.Connection = None
+    pool_size: int = 5          # connections opened up front and never reaped
+    max_pool_size: int = 20     # upper bound, extra connections are opened on demand
+    idle_timeout: float = 60.0  # idle connections above pool_size are closed after this
+    validate_after: float = 30.0  # connections idle longer than this are pinged on checkout
+    fast_executemany: bool = False
+    _conn_str: str = None
+    _idle: deque = None
+    _size: int = 0
+    _cond: threading.Condition = None
+    _stmt_cache: dict = None    # id(connection) -> OrderedDict[sql, cursor]
+    _tx: "_TxState" = None      # per-thread connection of the open transaction()
     driver_initialized: bool = False
     database_connected: bool = False
     
     driver_not_initialized = Exception("Driver not initialized.")
     database_not_connected = Exception("Database not connected.")
     
-    def __init__(self, server: str, database: str, port: int, username: str, password: str) -> None:
-        self.server   = server
-        self.database = database
-        self.port     = port
-        self.username = username 
-        self.password = password
-        
-    def _normalize_string(self, value: Any) -> Any:
-        """
-        检测并规范化字符串，移除宽字符中的 \x00 字节。
-        Args:
-            value: 输入值，可能是字符串或其他类型。
-        Returns:
-            规范化后的值（如果是字符串，则移除 \x00；其他类型保持不变）。
-        """
-        if isinstance(value, str) and '\x00' in value:
-            normalized = value.replace('\x00', '')
-            logger.debug(f"Normalized string: {value!r} -> {normalized!r}")
-            return normalized
-        return value
+    def __init__(self, server: str, database: str, port: int, username: str, password: str, pool_size: int = 5, fast_executemany: bool = False, max_pool_size: int = 20) -> None:
+        self.server    = server
+        self.database  = database
+        self.port      = port
+        self.username  = username 
+        self.password  = password
+        self.pool_size = pool_size
+        self.max_pool_size = max(max_pool_size, pool_size)
+        self.fast_executemany = fast_executemany
         
     def set_driver(self, driver: str) -> None:
         self.driver             = driver
         self.driver_initialized = True
         self.database_connected = False
+        self._reset_validation()
         
     def connect(self) -> None:
         conn_str = f'''
-        DRIVER={{{self.driver}}};SERVER={self.server};PORT={self.port};DATABASE={self.database};UID={self.username};PWD={self.password};CHARSET=utf8mb4;OPTION=3
+        DRIVER={{{self.driver}}};SERVER={self.server};PORT={self.port};DATABASE={self.database};UID={self.username};PWD={self.password};CHARSET=utf8mb4;OPTION=3;MULTI_STATEMENTS=1
         '''
         try:
-            self.conn               = pyodbc.connect(conn_str)
+            self._conn_str = conn_str
+            self._cond     = threading.Condition()
+            self._stmt_cache = {}
+            self._tx       = _TxState()
+            now            = time.monotonic()
+            self._idle     = deque((self._open(), now) for _ in range(self.pool_size))
+            self._size     = self.pool_size
             self.database_connected = True
         except Exception as e:
             raise Exception("Connection failed!", e)
     
     def close(self) -> None:
-        if self.conn:
-            self.conn.close()
+        if self._cond:
+            with self._cond:
+                while self._idle:
+                    conn = self._idle.pop()[0]
+                    self._forget_statements(conn)
+                    conn.close()
+                self._size = 0
         self.database_connected = False
+        self._reset_validation()
+
+    def _open(self) -> pyodbc.Connection:
+        conn = pyodbc.connect(self._conn_str, autocommit=False)
+        # MySQL 驱动以 UTF-8 收发 CHAR 与 WCHAR 数据；按默认的 UTF-16 解码会在
+        # 字符串中夹带 \x00，固定编码后结果无需再逐格清理
+        conn.setdecoding(pyodbc.SQL_CHAR, encoding="utf-8")
+        conn.setdecoding(pyodbc.SQL_WCHAR, encoding="utf-8")
+        conn.setencoding(encoding="utf-8")
+        return conn
+
+    def _is_alive(self, conn: pyodbc.Connection) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _acquire(self) -> pyodbc.Connection:
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()  # LIFO：优先复用最近归还的连接
+                    break
+                if self._size < self.max_pool_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                self._cond.wait()
+        try:
+            if conn is None:
+                return self._open()
+            if time.monotonic() - last_used > self.validate_after and not self._is_alive(conn):
+                logger.info("Replacing a dead pooled connection")
+                self._forget_statements(conn)
+                try:
+                    conn.close()
+                except pyodbc.Error:
+                    pass
+                return self._open()
+            return conn
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: pyodbc.Connection) -> None:
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            self._idle.append((conn, now))
+            # 超出 pool_size 的部分空闲过久则关闭（最久未用的在队首）
+            while self._size > self.pool_size and now - self._idle[0][1] > self.idle_timeout:
+                stale.append(self._idle.popleft()[0])
+                self._size -= 1
+            self._cond.notify()
+        for c in stale:
+            self._forget_statements(c)
+            try:
+                c.close()
+            except pyodbc.Error:
+                pass
+
+    def _cached_cursor(self, conn: pyodbc.Connection, query: str) -> pyodbc.Cursor:
+        """
+        Return the cursor dedicated to `query` on `conn`, creating it on first use.
+        Re-executing the same SQL text on the same cursor lets pyodbc reuse the
+        prepared statement handle instead of preparing it again.
+        Only the thread that has `conn` checked out touches its cache.
+        """
+        cache = self._stmt_cache.get(id(conn))
+        if cache is None:
+            cache = self._stmt_cache[id(conn)] = OrderedDict()
+        cursor = cache.get(query)
+        if cursor is None:
+            cursor = cache[query] = conn.cursor()
+            if len(cache) > _STMT_CACHE_SIZE:
+                cache.popitem(last=False)[1].close()
+        else:
+            cache.move_to_end(query)
+        return cursor
+
+    def _forget_statements(self, conn: pyodbc.Connection, query: str = None) -> None:
+        """
+        Close and drop the cached cursors of `conn` (or just the one for `query`).
+        """
+        if query is not None:
+            cursors = [self._stmt_cache.get(id(conn), {}).pop(query, None)]
+        else:
+            cursors = list((self._stmt_cache.pop(id(conn), None) or {}).values())
+        for cursor in cursors:
+            if cursor is None:
+                continue
+            try:
+                cursor.close()
+            except pyodbc.Error:
+                pass
+
+    @contextmanager
+    def _connection(self):
+        """
+        Check a connection out of the pool for the duration of one call.
+        Inside transaction() the thread's transaction connection is reused instead.
+        """
+        conn = self._tx.conn
+        if conn is not None:
+            yield conn
+            return
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run every Database call made by this thread inside the block on one
+        connection and commit them together (one commit instead of one per
+        statement). Rolls back if the block raises; nested blocks join the
+        outer transaction.
+        """
+        self._validation()
+        if self._tx.conn is not None:
+            yield
+            return
+        with self._connection() as conn:
+            self._tx.conn = conn
+            try:
+                yield
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._tx.conn = None
+
+    def _commit(self, conn: pyodbc.Connection) -> None:
+        # 事务块内由 transaction() 统一提交
+        if self._tx.conn is None:
+            conn.commit()
+
+    def _rollback(self, conn: pyodbc.Connection) -> None:
+        # 事务块内由 transaction() 统一回滚（异常会继续向外抛出）
+        if self._tx.conn is None:
+            conn.rollback()
         
     def _validation(self) -> None:
         if not self.driver_initialized:
             raise self.driver_not_initialized
         if not self.database_connected:
             raise self.database_not_connected
+        # 校验通过后以实例属性覆盖为空操作；set_driver/close 时恢复
+        self._validation = _no_validation
+
+    def _reset_validation(self) -> None:
+        self.__dict__.pop("_validation", None)
         
     def get_version(self) -> str:
         self._validation()
-        with self.conn.cursor() as cursor:
+        with self._connection() as conn, closing(conn.cursor()) as cursor:
             cursor.execute("SELECT VERSION();")
             record = cursor.fetchone()
+            self._commit(conn)
         return record[0]
     
     def create_table(
@@ -97,9 +381,9 @@ class Database:
         query = f"CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{table_name} (\n  {col_sql}\n);"
 
         try:
-            with self.conn.cursor() as cursor:
+            with self._connection() as conn, closing(conn.cursor()) as cursor:
                 cursor.execute(query)
-                self.conn.commit()
+                self._commit(conn)
         except Exception as e:
             raise Exception(f"Table creation failed: {e}\nQuery: {query}")
 
@@ -112,36 +396,37 @@ class Database:
     ) -> None:
         self._validation()
 
-        data = {key: data[key] for key in data.keys() if data[key] is not None}
-        if isinstance(data, dict):
-            data = [data]
-        if not data:
+        rows = [data] if isinstance(data, dict) else data
+        if not rows:
             return
-
-        columns = list(data[0].keys())
-        column_names = ", ".join(columns)
-
-        values_list = []
-        for row in data:
-            values = [self._format_value(row[col]) for col in columns]
-            values_list.append(f"({', '.join(values)})")
-        values_sql = ", ".join(values_list)
-
+        # None 值不写入，交给列默认值；多行时取各行非 None 列的并集，
+        # 其余行在这些列上的 None 作为 NULL 绑定
+        if len(rows) == 1:
+            columns = tuple(key for key, value in rows[0].items() if value is not None)
+        else:
+            columns = tuple(dict.fromkeys(
+                key for row in rows for key, value in row.items() if value is not None))
         if on_duplicate_update:
-            update_clause = ", ".join([f"{col}=VALUES({col})" for col in columns])
-            query = f"INSERT INTO {table_name} ({column_names}) VALUES {values_sql} ON DUPLICATE KEY UPDATE {update_clause}"
-        elif ignore_conflict:
-            query = f"INSERT IGNORE INTO {table_name} ({column_names}) VALUES {values_sql}"
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join([f"{col}=VALUES({col})" for col in columns])
         else:
-            query = f"INSERT INTO {table_name} ({column_names}) VALUES {values_sql}"
+            suffix = ""
+        chunk = _insert_chunk_size(len(columns))
 
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(query)
-                self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise Exception(f"Data insertion failed: {e}\nQuery: {query}")
+        query = None
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    # 分块发送，所有块在同一事务中提交
+                    for start in range(0, len(rows), chunk):
+                        part = rows[start:start + chunk]
+                        query = _build_insert_sql(table_name, columns, len(part)) + suffix
+                        if ignore_conflict and not on_duplicate_update:
+                            query = query.replace("INSERT INTO", "INSERT IGNORE INTO", 1)
+                        cursor.execute(query, _flat_values(part, columns))
+                    self._commit(conn)
+            except Exception as e:
+                self._rollback(conn)
+                raise Exception(f"Data insertion failed: {e}\nQuery: {query}")
 
     def select_data(
         self,
@@ -156,47 +441,48 @@ class Database:
         group_by: str = None,
         having: str = None,
         joins: list[str] = None,
-        as_dict: bool = False
+        as_dict: bool = False,
+        stream: bool = False
     ):
-        from contextlib import closing
+        """
+        Build and run a SELECT. Returns a list of rows (dicts with `as_dict`),
+        or, with `stream=True`, an iterator fetching rows in batches (see iter_query).
+        """
         self._validation()
-        columns_sql = ", ".join(columns) if columns else "*"
-        select_clause = f"SELECT {'DISTINCT ' if distinct else ''}{columns_sql}"
-        query = f"{select_clause} FROM {table_name}"
-        
-        print(where, where_params)
-
-        if joins:
-            for join in joins:
-                query += f" {join}"
-        if where and where_params:
-            query += f" WHERE {self._format_where_clause(where, where_params)}"
-        elif where:
-            query += f" WHERE {where}"
-        if group_by:
-            query += f" GROUP BY {group_by}"
-        if having:
-            query += f" HAVING {having}"
-        if order_by:
-            query += f" ORDER BY {order_by}"
+        query = _build_select_sql(
+            table_name, tuple(columns) if columns else None, where, order_by,
+            limit is not None, offset is not None, distinct, group_by, having,
+            tuple(joins) if joins else None)
+
+        params = list(where_params) if where_params else []
         if limit is not None:
-            query += f" LIMIT {limit}" + (f" OFFSET {offset}" if offset is not None else "")
+            params.append(limit)
+            if offset is not None:
+                params.append(offset)
 
-        print(f"Executing query: {query}")  # Debug
+        logger.debug("Executing query: %s params: %s", query, params)
+        if stream:
+            return self.iter_query(query, tuple(params), _FETCH_CHUNK_ROWS, as_dict)
         try:
-            # 每次使用新的游标，并确保关闭
-            with closing(self.conn.cursor()) as cursor:
-                cursor.execute(query)
+            # 同一形状的查询 SQL 文本相同（见 _build_select_sql），复用该连接上缓存的预处理语句
+            with self._connection() as conn:
+                cursor = self._cached_cursor(conn, query)
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                except pyodbc.Error:
+                    self._forget_statements(conn, query)
+                    raise
+                names = [d[0] for d in cursor.description] if as_dict else None
+                # 列表模式整体取回；需要控制内存时用 stream=True 分批迭代
                 results = cursor.fetchall()
+                self._commit(conn)
 
-            normalized = []
-            for row in results:
-                if as_dict:
-                    # 如果 as_dict，需要转换字典形式，可根据需要自行实现
-                    normalized.append({k: self._normalize_string(v) for k, v in row.items()})
-                else:
-                    normalized.append(tuple(self._normalize_string(v) for v in row))
-            return normalized
+            if as_dict:
+                return [dict(zip(names, row)) for row in results]
+            return results
         except Exception as e:
             raise Exception(f"Data selection failed: {e}Query: {query}")
 
@@ -206,8 +492,13 @@ class Database:
         if_exists: bool = True,
         cascade: bool = False,
         dry_run: bool = False,
-        confirm: bool = True
+        confirm: Callable[[str], bool] | bool = False
     ) -> None:
+        """
+        Drop one or more tables. Never prompts: a table is only dropped when
+        `confirm` is True or a callable returning True for its name, so server
+        code can plug in its own (non-blocking) policy check.
+        """
         self._validation()
         names = [table_names] if isinstance(table_names, str) else table_names
         for name in names:
@@ -215,15 +506,13 @@ class Database:
             if dry_run:
                 print(f"[DRY RUN] Would execute: {query}")
                 continue
-            if confirm:
-                ans = input(f"⚠️ Drop table '{name}'? Type 'yes' to confirm: ")
-                if ans.lower() != 'yes':
-                    print(f"Skipping {name}")
-                    continue
+            if not (confirm(name) if callable(confirm) else confirm):
+                logger.info("Skipping drop of unconfirmed table %s", name)
+                continue
             try:
-                with self.conn.cursor() as cursor:
+                with self._connection() as conn, closing(conn.cursor()) as cursor:
                     cursor.execute(query)
-                    self.conn.commit()
+                    self._commit(conn)
                 print(f"Dropped table: {name}")
             except Exception as e:
                 raise Exception(f"Failed to drop table {name}: {e}")
@@ -236,20 +525,20 @@ class Database:
         where_params: Tuple[Any, ...] = ()
     ) -> int:
         self._validation()
-        cols = data.keys()
-        set_clause = ", ".join(f"{c} = " + self._format_value(data[c]) for c in cols)
-        where_clause = self._format_where_clause(where, where_params) if where_params else where
-        query = f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(query)
+        query = _build_update_sql(table_name, tuple(data), where)
+        params = [*data.values(), *where_params]
+        with self._connection() as conn:
+            try:
+                cursor = self._cached_cursor(conn, query)
+                cursor.execute(query, params)
                 affected = cursor.rowcount
-                self.conn.commit()
-            logger.info(f"UPDATE 成功: {query}, affected={affected}")
-            return affected
-        except Exception as e:
-            self.conn.rollback()
-            raise Exception(f"Update failed: {e}\nQuery: {query}")
+                self._commit(conn)
+                logger.info("UPDATE 成功: %s, affected=%s", query, affected)
+                return affected
+            except Exception as e:
+                self._rollback(conn)
+                self._forget_statements(conn, query)
+                raise Exception(f"Update failed: {e}\nQuery: {query}")
 
     def delete_data(
         self,
@@ -258,47 +547,304 @@ class Database:
         where_params: Tuple[Any, ...] = ()
     ) -> int:
         self._validation()
-        where_clause = self._format_where_clause(where, where_params) if where_params else where
-        query = f"DELETE FROM {table_name} WHERE {where_clause}"
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(query)
+        query = f"DELETE FROM {table_name} WHERE {where}"
+        with self._connection() as conn:
+            try:
+                cursor = self._cached_cursor(conn, query)
+                if where_params:
+                    cursor.execute(query, where_params)
+                else:
+                    cursor.execute(query)
                 affected = cursor.rowcount
-                self.conn.commit()
-            logger.info(f"DELETE 成功: {query}, affected={affected}")
-            return affected
-        except Exception as e:
-            self.conn.rollback()
-            raise Exception(f"Delete failed: {e}\nQuery: {query}")
+                self._commit(conn)
+                logger.info("DELETE 成功: %s, affected=%s", query, affected)
+                return affected
+            except Exception as e:
+                self._rollback(conn)
+                self._forget_statements(conn, query)
+                raise Exception(f"Delete failed: {e}\nQuery: {query}")
 
     def execute_query(self, query: str, params: Tuple[Any, ...] = ()) -> List[Any]:
+        """
+        Execute a raw statement with driver-bound parameters, so the SQL text stays
+        identical across calls and the server can reuse its plan. The statement runs
+        on a per-connection cached cursor (see _cached_cursor).
+        Returns the rows if the statement produced a result set, else [].
+        """
         self._validation()
-        formatted = self._format_query(query, params) if params else query
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(formatted)
-                if formatted.strip().upper().startswith("SELECT"):
-                    return cursor.fetchall()
+        with self._connection() as conn:
+            try:
+                cursor = self._cached_cursor(conn, query)
+                if params:
+                    cursor.execute(query, params)
                 else:
-                    self.conn.commit()
-                    return []
-        except pyodbc.Error as e:
-            self.conn.rollback()
-            logger.error(f"Query execution failed: {e}\nQuery: {formatted}")
-            raise
+                    cursor.execute(query)
+                # 有结果集即有 description，无需解析 SQL 文本判断是否为 SELECT
+                if cursor.description is not None:
+                    rows = cursor.fetchall()
+                else:
+                    rows = []
+                # 结束事务（只读查询也一样），避免池中连接持有旧快照
+                self._commit(conn)
+                return rows
+            except pyodbc.Error as e:
+                self._rollback(conn)
+                self._forget_statements(conn, query)
+                logger.error("Query execution failed: %s\nQuery: %s", e, query)
+                raise
+
+    def iter_query(
+        self,
+        query: str,
+        params: Tuple[Any, ...] = (),
+        chunksize: int = 500,
+        as_dict: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Execute a SELECT and yield its rows, fetching `chunksize` rows at a time
+        instead of materializing the whole result set. With `as_dict` each row is
+        yielded as a dict keyed by the column names read once from the cursor.
+        The pooled connection is held until the iterator is exhausted or closed.
+        """
+        self._validation()
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    names = [d[0] for d in cursor.description] if as_dict else None
+                    while True:
+                        rows = cursor.fetchmany(chunksize)
+                        if not rows:
+                            break
+                        if names:
+                            yield from (dict(zip(names, row)) for row in rows)
+                        else:
+                            yield from rows
+            finally:
+                # 游标关闭后结束事务（迭代器提前关闭或出错时也一样），避免池中连接持有旧快照
+                self._commit(conn)
+
+    def iter_rows(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        where: Optional[str] = None,
+        where_params: Optional[Tuple[Any, ...]] = None,
+        order_by: Optional[str] = None,
+        joins: Optional[List[str]] = None,
+        chunksize: int = 1000
+    ) -> Iterator[Any]:
+        """
+        Streaming counterpart of select_data: yields rows `chunksize` at a time.
+        Args:
+            table_name (str): Table to read from.
+            columns (List[str], optional): Columns to select, defaults to all.
+            where (str, optional): WHERE clause with `?` placeholders.
+            where_params (tuple, optional): Values bound to the WHERE placeholders.
+            order_by (str, optional): ORDER BY clause.
+            joins (List[str], optional): JOIN clauses.
+            chunksize (int): Rows fetched per round-trip.
+        """
+        query = _build_select_sql(
+            table_name, tuple(columns) if columns else None, where, order_by,
+            False, False, False, None, None, tuple(joins) if joins else None)
+        return self.iter_query(query, tuple(where_params) if where_params else (), chunksize)
 
     def execute_non_query(self, query: str, params: Tuple[Any, ...] = ()) -> None:
         self._validation()
-        formatted = self._format_query(query, params) if params else query
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(formatted)
-                self.conn.commit()
-            logger.info(f"Non-query executed successfully: {formatted}")
-        except pyodbc.Error as e:
-            self.conn.rollback()
-            logger.error(f"Non-query execution failed: {e}\nQuery: {formatted}")
-            raise
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    self._commit(conn)
+                logger.info("Non-query executed successfully: %s", query)
+            except pyodbc.Error as e:
+                self._rollback(conn)
+                logger.error("Non-query execution failed: %s\nQuery: %s", e, query)
+                raise
+
+    def execute_many(
+        self,
+        query: str,
+        seq_params: List[Tuple[Any, ...]],
+        input_sizes: List[Optional[Tuple[int, int, int]]] = None,
+    ) -> None:
+        """
+        Execute one statement for each parameter tuple and commit once.
+        With fast_executemany enabled the driver sends all parameter sets as an
+        ODBC parameter array instead of one execute per row; `input_sizes` is
+        passed to cursor.setinputsizes() so the arrays are sized once.
+        """
+        self._validation()
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    cursor.fast_executemany = self.fast_executemany
+                    if input_sizes:
+                        cursor.setinputsizes(input_sizes)
+                    cursor.executemany(query, seq_params)
+                    self._commit(conn)
+            except pyodbc.Error as e:
+                self._rollback(conn)
+                logger.error("Executemany failed: %s\nQuery: %s", e, query)
+                raise
+
+    def insert_many(self, table_name: str, columns: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> None:
+        """
+        Insert many rows over `columns` on one pooled connection in one transaction.
+        With fast_executemany the rows go out as an ODBC parameter array via
+        executemany, with string columns pre-sized (see _input_sizes); otherwise
+        as multi-row INSERTs of at most _INSERT_CHUNK_ROWS rows, one execute per
+        chunk so each statement stays under the placeholder and packet limits.
+        Args:
+            table_name (str): Table to insert into.
+            columns (tuple): Column names, in the order of each row's values.
+            rows (List[tuple]): Row values; None is bound as NULL.
+        """
+        if not rows:
+            return
+        columns = tuple(columns)
+        if self.fast_executemany:
+            self.execute_many(_build_insert_sql(table_name, columns), rows, _input_sizes(rows))
+            return
+        self._validation()
+        chunk = _insert_chunk_size(len(columns))
+        query = None
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    for start in range(0, len(rows), chunk):
+                        part = rows[start:start + chunk]
+                        query = _build_insert_sql(table_name, columns, len(part))
+                        cursor.execute(query, tuple(chain.from_iterable(part)))
+                self._commit(conn)
+            except pyodbc.Error as e:
+                self._rollback(conn)
+                logger.error("Bulk insert failed: %s\nQuery: %s", e, query)
+                raise
+
+    def build_insert(self, table_name: str, data: dict[str, Any]) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Build a parameterized single-row INSERT statement, skipping None values.
+        Returns:
+            (query, params) ready to be passed to execute_batch.
+        """
+        row = {key: value for key, value in data.items() if value is not None}
+        return _build_insert_sql(table_name, tuple(row)), tuple(row.values())
+
+    def execute_batch(self, statements: List[Tuple[str, Tuple[Any, ...]]]) -> List[Any]:
+        """
+        Send several statements to the server as one multi-statement packet
+        (requires MULTI_STATEMENTS on the connection) and commit them together.
+        Args:
+            statements: list of (query, params) pairs, executed in order.
+        Returns:
+            Rows of the last statement that produced a result set, else [].
+        """
+        result_sets = self.execute_batch_results(statements)
+        return result_sets[-1] if result_sets else []
+
+    def execute_batch_results(self, statements: List[Tuple[str, Tuple[Any, ...]]]) -> List[List[Any]]:
+        """
+        Same as execute_batch, but returns the rows of every statement that
+        produced a result set, in order.
+        """
+        self._validation()
+        query = ";\n".join(sql.strip().rstrip(";") for sql, _ in statements)
+        params = [value for _, stmt_params in statements for value in stmt_params]
+        with self._connection() as conn:
+            try:
+                with closing(conn.cursor()) as cursor:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    result_sets = []
+                    while True:
+                        if cursor.description is not None:
+                            result_sets.append(cursor.fetchall())
+                        if not cursor.nextset():
+                            break
+                    self._commit(conn)
+                return result_sets
+            except pyodbc.Error as e:
+                self._rollback(conn)
+                logger.error("Batch execution failed: %s\nQuery: %s", e, query)
+                raise
+
+    def update_returning(
+        self,
+        table_name: str,
+        data: dict[str, Any],
+        where: str,
+        where_params: Tuple[Any, ...],
+        columns: List[str],
+        joins: List[str] = None
+    ) -> Tuple[Any, Any]:
+        """
+        Update the row matched by `where` and return its (old_row, new_row) images,
+        read before and after the UPDATE in the same transaction and round-trip
+        (the old image is locked with FOR UPDATE). Both are None if nothing matched.
+        `joins` only apply to the two SELECTs, e.g. to pull in detail tables.
+        """
+        cols = data.keys()
+        set_clause = ", ".join(f"{c} = ?" for c in cols)
+        select = f"SELECT {', '.join(columns)} FROM {table_name} {' '.join(joins or [])} WHERE {where}"
+        old_rows, new_rows = self.execute_batch_results([
+            (f"{select} FOR UPDATE", tuple(where_params)),
+            (f"UPDATE {table_name} SET {set_clause} WHERE {where}",
+             tuple(data[c] for c in cols) + tuple(where_params)),
+            (select, tuple(where_params)),
+        ])
+        return (old_rows[0] if old_rows else None, new_rows[0] if new_rows else None)
+
+    def batch_select(
+        self,
+        table_name: str,
+        key_col: str,
+        keys: Iterable[Any],
+        columns: Optional[List[str]] = None,
+        chunksize: int = _INSERT_CHUNK_ROWS
+    ) -> Dict[Any, List[Any]]:
+        """
+        Fetch the rows for many keys with WHERE key_col IN (...) instead of one
+        query per key, and bucket them by key.
+        Args:
+            table_name (str): Table to read from.
+            key_col (str): Column matched against `keys`; must be among `columns`.
+            keys (Iterable): Key values; duplicates are queried once.
+            columns (List[str], optional): Columns to select, defaults to all.
+            chunksize (int): Maximum keys per IN list (one query per chunk).
+        Returns:
+            Dict[Any, List[Any]]: Rows per key; keys without rows are absent.
+        """
+        keys = list(dict.fromkeys(keys))
+        result: Dict[Any, List[Any]] = defaultdict(list)
+        if not keys:
+            return result
+        columns = list(columns) if columns else None
+        key_index = columns.index(key_col) if columns else None
+        columns_sql = ", ".join(columns) if columns else "*"
+        for start in range(0, len(keys), chunksize):
+            part = keys[start:start + chunksize]
+            rows = self.execute_query(
+                f"SELECT {columns_sql} FROM {table_name} WHERE {key_col} IN ({', '.join('?' for _ in part)})",
+                tuple(part))
+            for row in rows:
+                result[row[key_index] if key_index is not None else getattr(row, key_col)].append(row)
+        return result
+
+    def exists(self, table_name: str, where: str, where_params: Tuple[Any, ...] = ()) -> bool:
+        """
+        Whether any row of `table_name` matches `where`, without fetching it.
+        """
+        return bool(self.execute_query(f"SELECT 1 FROM {table_name} WHERE {where} LIMIT 1", where_params))
 
     def init_db(self):
         create_users_table = """
@@ -314,19 +860,5 @@ class Database:
             self.execute_query(create_users_table)
             logger.info("Database schema initialized.")
         except Exception as e:
-            logger.error(f"Failed to initialize database schema: {e}")
+            logger.error("Failed to initialize database schema: %s", e)
             raise
-
-    def _format_value(self, value: Any) -> str:
-        if isinstance(value, str):
-            return f"'{value}'"
-        return "NULL" if value is None else str(value)
-
-    def _format_where_clause(self, where: str, params: Tuple[Any, ...]) -> str:
-        parts = where.split("?")
-        if len(parts) != len(params) + 1:
-            raise ValueError("Number of placeholders does not match number of parameters.")
-        return ''.join(p + (f"'{v}'" if isinstance(v, str) else "NULL" if v is None else str(v)) for p, v in zip(parts, params + ('',)))
-
-    def _format_query(self, query: str, params: Tuple[Any, ...]) -> str:
-        return self._format_where_clause(query, params)
@@ -1,10 +1,19 @@
 from icrawler.builtin import GoogleImageCrawler, ImageDownloader
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import atexit
 import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 
 class DynamicImage:
     CACHE_FILE = "dynapic_cache.json"
+    _cache = None   # 进程内共享的缓存：f"{index}𥪝{keyword}" -> url
+    _dirty = False
+    _cache_lock = threading.Lock()
 
     class CustomLinkPrinter(ImageDownloader):
         def __init__(self, *args, **kwargs):
@@ -42,12 +51,36 @@ class DynamicImage:
         self._initialize_cache()
 
     def _initialize_cache(self):
-        try:
-            with open(self.CACHE_FILE, "r") as f:
-                json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            with open(self.CACHE_FILE, "w") as f:
-                json.dump({}, f)
+        # 缓存文件每个进程只读取一次，之后所有实例共享内存中的字典
+        cls = type(self)
+        with cls._cache_lock:
+            if cls._cache is not None:
+                return
+            try:
+                with open(self.CACHE_FILE, "r") as f:
+                    cls._cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                cls._cache = {}
+                cls._dirty = True
+            atexit.register(cls.flush)
+
+    @classmethod
+    def flush(cls):
+        """
+        Write the in-memory cache back to CACHE_FILE if it changed; the file
+        is replaced atomically so readers never see a partial write.
+        """
+        with cls._cache_lock:
+            if not cls._dirty or cls._cache is None:
+                return
+            tmp = cls.CACHE_FILE + ".tmp"
+            try:
+                with open(tmp, "w") as new_cache:
+                    json.dump(cls._cache, new_cache, indent=4)
+                os.replace(tmp, cls.CACHE_FILE)
+                cls._dirty = False
+            except Exception:
+                logger.exception("Error saving cache to %s", cls.CACHE_FILE)
 
     def _crawl_and_store(self, keyword, index):
         google_crawler = GoogleImageCrawler(
@@ -62,42 +95,20 @@ class DynamicImage:
             self.results[(keyword, index)] = result
 
     def _key_exists_in_cache(self, keyword: str, index=0):
-        try:
-            with open(self.CACHE_FILE, "r") as cache_file:
-                cache_data = json.load(cache_file)
-                return f"{index}𥪝{keyword}" in cache_data
-        except (FileNotFoundError, json.JSONDecodeError):
-            return False
+        return f"{index}𥪝{keyword}" in self._cache
 
     def _load_cache(self, keyword: str, index=0):
-        try:
-            with open(self.CACHE_FILE, "r") as cache_file:
-                cache_data = json.load(cache_file)
-                return cache_data.get(f"{index}𥪝{keyword}")
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise Exception(
-                f"Failed to access \"{self.CACHE_FILE}:{keyword}.\"")
+        return self._cache.get(f"{index}𥪝{keyword}")
 
     def _save_cache(self, keyword: str, result: str, index=0):
         if result is None:
-            print(
-                f"Warning: No result found for {keyword} (index {index}), skipping cache.")
+            logger.warning("No result found for %s (index %s), skipping cache.", keyword, index)
             return
 
-        try:
-            with self.lock:
-                try:
-                    with open(self.CACHE_FILE, "r") as cache_file:
-                        cache_data = json.load(cache_file)
-                except (FileNotFoundError, json.JSONDecodeError):
-                    cache_data = {}
-
-                cache_data[f"{index}𥪝{keyword}"] = result
-
-                with open(self.CACHE_FILE, "w") as new_cache:
-                    json.dump(cache_data, new_cache, indent=4)
-        except Exception as e:
-            print(f"Error saving cache: {e}")
+        cls = type(self)
+        with cls._cache_lock:
+            cls._cache[f"{index}𥪝{keyword}"] = result
+            cls._dirty = True
 
     def by_keyword(self, keyword: str, index=0):
         if self.enable_cache and self._key_exists_in_cache(keyword, index):
@@ -108,29 +119,39 @@ class DynamicImage:
 
         if self.enable_cache:
             self._save_cache(keyword, result, index)
+            self.flush()
 
         return result
 
-    def by_keywords(self, keywords: list):
+    def by_keywords(self, keywords: list, max_workers: int = 8):
         results = {}
-        threads = []
-
-        def process_keyword(keyword):
+        misses = []
+        for keyword in dict.fromkeys(keywords):
             if self.enable_cache and self._key_exists_in_cache(keyword, 0):
                 results[keyword] = self._load_cache(keyword, 0)
             else:
-                self._crawl_and_store(keyword, 0)
+                misses.append(keyword)
+
+        if misses:
+            # 限制并发抓取数，而不是每个关键词一个线程
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(self._crawl_and_store, keyword, 0): keyword
+                           for keyword in misses}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception:
+                        # 单个关键词抓取失败只影响该关键词，结果保持为 None
+                        logger.exception("Image crawl failed for %r", futures[future])
+
+            for keyword in misses:
                 result = self.results.get((keyword, 0))
+                results[keyword] = result
                 if self.enable_cache:
                     self._save_cache(keyword, result, 0)
-                results[keyword] = result
-
-        for keyword in keywords:
-            thread = threading.Thread(target=process_keyword, args=(keyword,))
-            thread.start()
-            threads.append(thread)
 
-        for thread in threads:
-            thread.join()
+            if self.enable_cache:
+                # 所有新结果写入内存后只落盘一次
+                self.flush()
 
         return results
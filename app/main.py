@@ -3,10 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from contextlib import asynccontextmanager
 from .db.connection import Database
+from .crud.audit import AuditLogService
 from .api.auth import router as auth_router
 from .api.customer import router as customer_router
 from .api.staff import router as staff_router
 from .api.admin import router as admin_router
+import logging
 import os
 
 SERVER = os.environ.get("SERVER")
@@ -15,19 +17,29 @@ USERNAME = os.environ.get("USERNAME_")
 PASSWORD = os.environ.get("PASSWORD")
 DRIVER = os.environ.get("DRIVER")
 PORT = int(os.environ.get("PORT"))
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+MAX_POOL_SIZE = int(os.environ.get("DB_MAX_POOL_SIZE", 20))
+FAST_EXECUTEMANY = os.environ.get("DB_FAST_EXECUTEMANY", "0") == "1"
+AUDIT_ENABLED = os.environ.get("AUDIT_ENABLED", "1") == "1"
+AUDIT_DISABLED_TABLES = frozenset(
+    t.strip() for t in os.environ.get("AUDIT_DISABLED_TABLES", "").split(",") if t.strip())
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan event handler for FastAPI to manage startup and shutdown events.
-    Initializes the database connection on startup and closes it on shutdown.
+    Initializes the database connection pool on startup and closes it on shutdown.
     Uses synchronous operations for database connection management.
     """
     # Startup: Initialize database connection synchronously
     # Store database instance in app.state for access in routes
-    app.state.db = Database(SERVER, DATABASE, PORT, USERNAME, PASSWORD)
+    app.state.db = Database(SERVER, DATABASE, PORT, USERNAME, PASSWORD, POOL_SIZE, FAST_EXECUTEMANY, MAX_POOL_SIZE)
     app.state.db.set_driver(DRIVER)
+    AuditLogService.enabled = AUDIT_ENABLED
+    AuditLogService.disabled_tables = AUDIT_DISABLED_TABLES
     try:
         app.state.db.connect()  # Test connection on startup (synchronous)
         print(f"The current MySQL version is {app.state.db.get_version()}")
@@ -36,8 +48,9 @@ async def lifespan(app: FastAPI):
 
     yield  # Application runs here
 
-    # Shutdown: Close database connection synchronously
+    # Shutdown: Write out queued audit events, then close database connection synchronously
     if hasattr(app.state, 'db') and app.state.db:
+        AuditLogService(app.state.db).flush()
         app.state.db.close()
 
 # Create FastAPI app with debug mode and lifespan handler
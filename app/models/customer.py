@@ -5,7 +5,7 @@ from datetime import datetime
 from enum import Enum
 
 
-@dataclass
+@dataclass(slots=True)
 class Vehicle:
     # Primary key, optional for new objects before DB insert
     vehicle_id: Optional[int] = None
@@ -5,7 +5,7 @@ from datetime import datetime
 from .enums import RepairStatus, StaffJobType
 
 
-@dataclass
+@dataclass(slots=True)
 class RepairRequest:
     # Primary key, optional for new objects before DB insert
     request_id: Optional[int] = None
@@ -15,6 +15,22 @@ class RepairRequest:
     status: Optional[str] = "pending"  # pending, or order_created
     request_time: Optional[datetime] = None
 
+    # Field names used for audit snapshots
+    _AUDIT_FIELDS = ("request_id", "vehicle_id", "customer_id",
+                     "description", "status", "request_time")
+
+    @classmethod
+    def from_row(cls, row) -> "RepairRequest":
+        """
+        Build a RepairRequest from a row in _AUDIT_FIELDS column order,
+        assigning slots directly instead of going through __init__'s kwargs.
+        The SELECT is expected to COALESCE a NULL status to 'pending'.
+        """
+        obj = cls.__new__(cls)
+        (obj.request_id, obj.vehicle_id, obj.customer_id,
+         obj.description, obj.status, obj.request_time) = row
+        return obj
+
     def asdict(self):
         return asdict(self)
 
@@ -3,8 +3,11 @@ from dataclasses import dataclass, asdict
 from typing import Optional, List
 from .enums import StaffJobType
 
+# jobtype value -> member; unknown or NULL values map to None
+_JOBTYPE_MAP = StaffJobType._value2member_map_
 
-@dataclass
+
+@dataclass(slots=True)
 class User:
     # Primary key, optional for new objects before DB insert
     user_id: Optional[int] = None
@@ -17,6 +20,11 @@ class User:
     # Field to distinguish user type (customer, staff, admin)
     discriminator: str = "customer"
 
+    # Column fields, precomputed per class; the user-table subset feeds
+    # asdict(only_parent=True). Audit snapshots drop password (see UserService)
+    _AUDIT_FIELDS = ("user_id", "name", "username", "password",
+                     "phone", "email", "address", "discriminator")
+
     def __repr__(self) -> str:
         """Representation of the User."""
         return f"<User {self.username}>"
@@ -25,13 +33,16 @@ class User:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Admin(User):
     # Foreign key to user.user_id, optional for new objects
     admin_id: Optional[int] = None
 
+    _AUDIT_FIELDS = User._AUDIT_FIELDS + ("admin_id",)
+
     def __init__(self, **kwargs):
-        super().__init__(**kwargs)
+        User.__init__(self, **kwargs)
+        self.admin_id = None  # slots have no class-level default to fall back on
         self.discriminator = "admin"
 
     def __repr__(self) -> str:
@@ -40,32 +51,47 @@ class Admin(User):
 
     def asdict(self, only_parent=False):
         if only_parent:
-            parent_attrs = {attr for attr in vars(User(
-                self.user_id, self.name, self.username, self.password, self.phone, self.email, self.address, self.discriminator))}
-            return {k: v for k, v in asdict(self).items() if k in parent_attrs}
+            return {k: getattr(self, k) for k in User._AUDIT_FIELDS}
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Staff(User):
     # Foreign key to user.user_id, optional for new objects
     staff_id: Optional[int] = None
     jobtype: Optional[StaffJobType] = None
     hourly_rate: int = 0
 
+    _AUDIT_FIELDS = User._AUDIT_FIELDS + ("staff_id", "jobtype", "hourly_rate")
+
     def __init__(self, **kwargs):
         kwargs["user_id"] = kwargs["staff_id"] if "staff_id" in kwargs else kwargs.get(
             "user_id", None)
         # print(kwargs)
         cleared_kwargs = {key: kwargs[key] for key in kwargs.keys() if not (
             key in ["staff_id", "jobtype", "hourly_rate"])}
-        print(cleared_kwargs)
-        super().__init__(**cleared_kwargs)
+        User.__init__(self, **cleared_kwargs)
         self.staff_id = kwargs.get("staff_id", self.user_id)
         self.jobtype = kwargs.get("jobtype", None)
         self.hourly_rate = kwargs.get("hourly_rate", None)
         self.discriminator = "staff"
 
+    @classmethod
+    def from_row(cls, row) -> "Staff":
+        """
+        Build a Staff from a user row (User._AUDIT_FIELDS order) followed by
+        jobtype and hourly_rate, assigning slots directly instead of going
+        through __init__'s kwargs filtering.
+        """
+        obj = cls.__new__(cls)
+        (obj.user_id, obj.name, obj.username, obj.password,
+         obj.phone, obj.email, obj.address) = row[0], row[1], row[2], row[3], row[4], row[5], row[6]
+        obj.discriminator = "staff"
+        obj.staff_id = row[0]
+        obj.jobtype = _JOBTYPE_MAP.get(row[8])
+        obj.hourly_rate = row[9] or 0
+        return obj
+
     def __repr__(self) -> str:
         """Representation of the Staff."""
         return f"<Staff {self.username}>"
@@ -79,19 +105,19 @@ class Staff(User):
 
     def asdict(self, only_parent=False):
         if only_parent:
-            parent_attrs = {attr for attr in vars(User(
-                self.user_id, self.name, self.username, self.password, self.phone, self.email, self.address, self.discriminator))}
-            return {k: v for k, v in asdict(self).items() if k in parent_attrs}
+            return {k: getattr(self, k) for k in User._AUDIT_FIELDS}
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Customer(User):
     # Foreign key to user.user_id, optional for new objects
     customer_id: Optional[int] = None
 
+    _AUDIT_FIELDS = User._AUDIT_FIELDS + ("customer_id",)
+
     def __init__(self, **kwargs):
-        super().__init__(**kwargs)
+        User.__init__(self, **kwargs)
         self.customer_id = kwargs.get("customer_id", self.user_id)
         self.discriminator = "customer"
 
@@ -101,7 +127,5 @@ class Customer(User):
 
     def asdict(self, only_parent=False):
         if only_parent:
-            parent_attrs = {attr for attr in vars(User(
-                self.user_id, self.name, self.username, self.password, self.phone, self.email, self.address, self.discriminator))}
-            return {k: v for k, v in asdict(self).items() if k in parent_attrs}
+            return {k: getattr(self, k) for k in User._AUDIT_FIELDS}
         return asdict(self)
@@ -82,6 +82,7 @@ class CustomerRepairRequestsResponse(BaseModel):
     message: Optional[str] = None
     customer_id: Optional[int] = None
     repair_requests: Optional[List[RepairRequestResponse]] = None
+    next_after_id: Optional[int] = None
 
 
 class RepairOrderResponse(BaseModel):
@@ -18,6 +18,19 @@ class StaffProfile(BaseModel):
     hourly_rate: Optional[int] = 0
 
 
+class StaffRepairOrderRequest(BaseModel):
+    description: Optional[str] = None
+    request_time: Optional[datetime] = None
+
+
+class StaffRepairOrderVehicle(BaseModel):
+    license_plate: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    type: Optional[str] = None
+    color: Optional[str] = None
+
+
 class StaffRepairOrder(BaseModel):
     order_id: Optional[int] = None
     vehicle_id: Optional[int] = None
@@ -29,6 +42,8 @@ class StaffRepairOrder(BaseModel):
     finish_time: Optional[datetime] = None
     remarks: Optional[str] = None
     time_worked: Optional[float] = None
+    request: Optional[StaffRepairOrderRequest] = None
+    vehicle: Optional[StaffRepairOrderVehicle] = None
 
 
 class StaffRepairOrdersResponse(BaseModel):
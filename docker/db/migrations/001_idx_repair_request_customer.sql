@@ -0,0 +1,7 @@
+-- 按客户分页查询维修请求的索引（手动执行一次，见 README）
+-- 支撑 RepairRequestService.get_repair_requests_by_customer_id 的 keyset 分页：
+--   WHERE customer_id = ? AND request_id > ? ORDER BY request_id [LIMIT ?]
+-- MySQL 不支持 INCLUDE 列，回表只发生在每页命中的行上
+-- 本目录不挂载到 /docker-entrypoint-initdb.d：表结构不在仓库中，初始化脚本先于建表运行
+CREATE INDEX idx_repair_request_customer
+    ON repair_request (customer_id, request_id);
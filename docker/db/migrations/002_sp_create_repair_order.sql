@@ -0,0 +1,36 @@
+-- 创建维修订单并写入 INSERT 审计记录：一次调用、一个事务（手动执行一次，见 README）
+-- 由 RepairOrderService.create_repair_order 通过 CALL 调用
+-- p_audit_new_data 为 AuditLogService 序列化好的 JSON 镜像；审计关闭时传 NULL，不写审计行
+DROP PROCEDURE IF EXISTS sp_create_repair_order;
+
+DELIMITER $$
+
+CREATE PROCEDURE sp_create_repair_order(
+    IN p_vehicle_id INT,
+    IN p_customer_id INT,
+    IN p_request_id INT,
+    IN p_required_staff_type VARCHAR(255),
+    IN p_status VARCHAR(255),
+    IN p_order_time DATETIME,
+    IN p_remarks TEXT,
+    IN p_audit_new_data JSON,
+    IN p_audit_operated_at DATETIME
+)
+BEGIN
+    DECLARE v_order_id INT;
+
+    INSERT INTO repair_order (vehicle_id, customer_id, request_id, required_staff_type, status, order_time, remarks)
+    VALUES (p_vehicle_id, p_customer_id, p_request_id, p_required_staff_type, p_status, p_order_time, p_remarks);
+
+    SET v_order_id = LAST_INSERT_ID();
+
+    IF p_audit_new_data IS NOT NULL THEN
+        INSERT INTO audit_log (table_name, record_id, operation, new_data, operated_at)
+        VALUES ('repair_order', v_order_id, 'INSERT',
+                JSON_SET(p_audit_new_data, '$.order_id', v_order_id), p_audit_operated_at);
+    END IF;
+
+    SELECT v_order_id;
+END$$
+
+DELIMITER ;